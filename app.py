@@ -1,36 +1,85 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import json
+import os
 import pickle
 import shap
 import matplotlib.pyplot as plt
+from datetime import datetime
 from streamlit_option_menu import option_menu
+from config import EXPERIMENT_CONFIG, EXPORT_CONFIG, MODEL_CONFIG, SAMPLING_CONFIG, SHAP_CONFIG, TABLE_CONFIG, USER_GROUPS
+from utils.cache import content_hash, load_uploaded_csv, get_dataset_index, get_filtered_view, show_cache_stats, cached_figure, cached_image, get_figure_cache
+from utils.data_processing import count_distinct, get_aggregate_cube, get_distinct_sketches, get_top_k_sketches, memory_report
+from utils.search import SearchIndex
+from utils.pagination import order_rows, get_page
+from utils.export import GZIP_FORMATS, export_file, export_file_name, export_mime_type
+from utils.aggregates import rollup
+from utils.filters import BitmapIndex, DateIndex, pack_rows, unpack_rows
+from utils.features import pipeline_from_legacy
+from utils.forest import load_forest
+from utils.predict import get_predictions
+from utils.explain import get_shap_values
+from visualizations import create_user_comparison_chart, create_session_duration_chart, create_engagement_heatmap, create_activity_timeline
 
 @st.cache_resource
 def load_model():
-    with open('model.pkl', 'rb') as f:
-        model = pickle.load(f)
-    with open('location_x_label_encoder.pkl', 'rb') as f:
-        encoder = pickle.load(f)
-    return model, encoder
-
-model, encoder = load_model()
+    """
+    Load the trained feature + model pipeline, preferring the memory-mapped
+    node-array artifact, or wrap model.pkl and its location encoder in the
+    same pipeline when it has not been built yet.
+    Returns (pipeline, hash of the artifact).
+    """
+    if os.path.exists(MODEL_CONFIG["forest_path"]):
+        return load_forest(MODEL_CONFIG["forest_path"])
+
+    if os.path.exists(MODEL_CONFIG["pipeline_path"]):
+        with open(MODEL_CONFIG["pipeline_path"], 'rb') as f:
+            data = f.read()
+        return pickle.loads(data), content_hash(data)
+
+    with open(MODEL_CONFIG["model_path"], 'rb') as f:
+        model_data = f.read()
+    with open(MODEL_CONFIG["encoder_path"], 'rb') as f:
+        encoder_data = f.read()
+    pipeline = pipeline_from_legacy(pickle.loads(model_data), pickle.loads(encoder_data))
+    return pipeline, content_hash(model_data + encoder_data)
+
+pipeline, model_hash = load_model()
+
+@st.cache_data
+def load_experiment_results(path, modified):
+    """
+    Read the run_experiments.py results file; modified keys the cache so a
+    rerun of the experiments is picked up
+    """
+    with open(path) as f:
+        return json.load(f)
+
+COMPARISON_CHARTS = {
+    "Age": lambda df, users: create_user_comparison_chart(df, 'age', users),
+    "Followers": lambda df, users: create_user_comparison_chart(df, 'followers', users),
+    "Followers vs following": lambda df, users: create_user_comparison_chart(df, 'engagement', users),
+    "Session duration": create_session_duration_chart,
+    "Engagement heatmap": create_engagement_heatmap,
+    "Activity timeline": create_activity_timeline
+}
 st.title("User Analytics & Model Explainability Dashboard")
 
 with st.sidebar:
     selected_tab = option_menu(
         menu_title="Navigation",
         options=[
-            "Problem", "Dataset", "EDA", "ML Experiments", "SHAP"
+            "Problem", "Dataset", "EDA", "Predict", "ML Experiments", "SHAP"
         ],
         icons=[
-            "puzzle", "folder", "bar-chart-line", "bezier", "search"
+            "puzzle", "folder", "bar-chart-line", "lightning", "bezier", "search"
         ],
         default_index=0,
         orientation="vertical"
     )
     uploaded_file = st.file_uploader("Upload CSV", type=['csv'])
-
-SAMPLE_SIZE = 1000
+    SAMPLE_SIZE = int(st.number_input("Sample size", min_value=100, value=SAMPLING_CONFIG["sample_size"], step=100))
 
 if selected_tab == "Problem":
     st.header("Project Problem Statement")
@@ -64,47 +113,104 @@ if selected_tab == "Problem":
     """)
 
 if uploaded_file:
-    df = pd.read_csv(uploaded_file)
-    sample_df = df.sample(SAMPLE_SIZE, random_state=42) if len(df) > SAMPLE_SIZE else df
+    try:
+        dataset_hash, df, sample_df, sampling_report = load_uploaded_csv(uploaded_file, SAMPLE_SIZE)
+    except ValueError as e:
+        # Empty files and files with a header but no rows
+        st.error(f"Error reading {uploaded_file.name}: {str(e)}")
+        st.stop()
+    full_df = df
+
+    date_index = get_dataset_index(dataset_hash, 'date_index', df, DateIndex)
+    bitmap_index = get_dataset_index(dataset_hash, 'bitmap_index', df, BitmapIndex)
+    first_date, last_date = date_index.bounds()
+    with st.sidebar:
+        use_date_filter = st.checkbox("Enable date filtering", disabled=first_date is None)
+        if use_date_filter:
+            start_date = st.date_input("Start Date", value=first_date.date(), min_value=first_date.date(), max_value=last_date.date())
+            end_date = st.date_input("End Date", value=last_date.date(), min_value=first_date.date(), max_value=last_date.date())
+
+        with st.expander("Filters"):
+            predicates = {
+                'platform': st.multiselect("Platform", bitmap_index.values('platform')),
+                'location': st.multiselect("Location", bitmap_index.values('location')),
+                'interest': st.multiselect("Interest", bitmap_index.values('interest')),
+                'age_bucket': st.multiselect("Age group", bitmap_index.values('age_bucket'))
+            }
+            combine_mode = st.radio("Match", ["all filters", "any filter"], horizontal=True, help="Whether a row must match every filter, including the date range, or just one of them")
+
+    view_key = None
+    use_bitmap_filter = any(predicates.values())
+    if use_date_filter or use_bitmap_filter:
+        date_range = None
+        if use_date_filter:
+            # Whole days, inclusive of the end date
+            date_range = (pd.Timestamp(start_date), pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns'))
+        mode = 'and' if combine_mode == "all filters" else 'or'
+
+        def select_rows():
+            selection = bitmap_index.select(predicates, mode)
+            if date_range is not None:
+                dates = pack_rows(date_index.rows_between(*date_range), len(df))
+                # With no other filter set, select() returns every row and the dates alone decide
+                selection = selection | dates if mode == 'or' and use_bitmap_filter else selection & dates
+            return unpack_rows(selection, len(df))
+
+        view_key = ('filters', date_range, tuple((dim, tuple(values)) for dim, values in predicates.items()), mode, SAMPLE_SIZE)
+        df, sample_df = get_filtered_view(dataset_hash, df, sample_df, view_key, select_rows)
+        st.sidebar.caption(f"{len(df):,} rows match the filters")
 
     if selected_tab == "EDA":
         N = 10
         users = sample_df['username_x'].value_counts().head(N).index.tolist() if 'username_x' in sample_df else []
         selected_users = st.sidebar.multiselect("Select users (top 10)", users)
+        exact_distinct = st.sidebar.checkbox("Exact distinct counts", help="Count every value instead of using the HyperLogLog sketch")
 
         st.header("User Database Analytics")
+        cube = get_aggregate_cube(df)
+        platform_x = {'platform': 'User X'}
+        totals = rollup(cube, ['platform'], where=platform_x).reindex(['User X']).iloc[0]
+
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Users", len(sample_df['username_x'].unique()) if 'username_x' in sample_df else 0)
-        col2.metric("Avg Age", round(sample_df['age_x'].mean(), 1) if 'age_x' in sample_df else 0)
-        col3.metric("Followers", int(sample_df['followers_x'].sum()) if 'followers_x' in sample_df else 0)
+        col1.metric("Total Users", count_distinct(df, 'username_x', exact_distinct))
+        col2.metric("Avg Age", round(totals['avg_age'], 1) if pd.notna(totals['avg_age']) else 0)
+        col3.metric("Followers", int(totals['followers']) if pd.notna(totals['followers']) else 0)
         engagement_rate = (
-            sample_df['followers_x'].sum() / sample_df['following_x'].sum() * 100
-            if ('followers_x' in sample_df and 'following_x' in sample_df and sample_df['following_x'].sum() > 0) else 0
+            totals['followers'] / totals['following'] * 100
+            if totals['following'] > 0 else 0
         )
         col4.metric("Engagement Rate", f"{engagement_rate:.2f}%")
+        username_sketch = get_distinct_sketches(df).get('username_x')
+        if exact_distinct and username_sketch is not None:
+            st.caption(
+                f"HyperLogLog estimate: {username_sketch.count(approximate=True):,} users "
+                f"(±{username_sketch.relative_error():.1%})"
+            )
 
         st.subheader("Location & Interest Distribution")
+        sketches = get_top_k_sketches(df)
         left, right = st.columns(2)
         with left:
-            if 'location_x' in sample_df:
-                top_locs = sample_df['location_x'].value_counts().nlargest(10).index
-                loc_data = sample_df[sample_df['location_x'].isin(top_locs)]
-                st.bar_chart(loc_data['location_x'].value_counts())
+            if 'location_x' in df:
+                st.bar_chart(sketches['location']['User X'].top_with_other(N))
         with right:
-            if 'interest_x' in sample_df:
-                top_intr = sample_df['interest_x'].value_counts().nlargest(10).index
-                intr_data = sample_df[sample_df['interest_x'].isin(top_intr)]
-                st.bar_chart(intr_data['interest_x'].value_counts())
+            if 'interest_x' in df:
+                st.bar_chart(sketches['interest']['User X'].top_with_other(N))
+        max_error = max(sketches[field]['User X'].max_error() for field in sketches)
+        if max_error:
+            st.caption(f"Top-{N} counts are estimates that may overcount by at most {max_error:,}.")
 
         st.subheader("Age Distribution & Engagement")
         left_age, right_eng = st.columns(2)
         with left_age:
             if 'age_x' in sample_df and selected_users:
+                user_ages = sample_df[sample_df['username_x'].isin(selected_users)].groupby('username_x')['age_x']
                 for user in selected_users:
-                    user_data = sample_df[sample_df['username_x'] == user]
-                    st.bar_chart(user_data['age_x'].value_counts().sort_index())
-            elif 'age_x' in sample_df:
-                st.bar_chart(sample_df['age_x'].value_counts().sort_index())
+                    if user in user_ages.groups:
+                        st.bar_chart(user_ages.get_group(user).value_counts().sort_index())
+            elif 'age_x' in df:
+                age_counts = rollup(cube, ['age'], where=platform_x)['count']
+                st.bar_chart(age_counts[age_counts.index.notna()])
         with right_eng:
             if 'followers_x' in sample_df and 'following_x' in sample_df and selected_users:
                 agg = sample_df[sample_df['username_x'].isin(selected_users)].groupby('username_x')[['followers_x', 'following_x']].sum()
@@ -113,10 +219,135 @@ if uploaded_file:
                 agg = sample_df.groupby('username_x')[['followers_x', 'following_x']].sum()
                 st.bar_chart(agg.head(N))
 
+        st.subheader("Platform Comparison")
+        chart_col, platforms_col = st.columns([1, 2])
+        chart_name = chart_col.selectbox("Chart", list(COMPARISON_CHARTS))
+        platforms = platforms_col.multiselect("Platforms", USER_GROUPS, default=USER_GROUPS)
+        if platforms:
+            build = COMPARISON_CHARTS[chart_name]
+            figure = cached_figure((dataset_hash, view_key), chart_name, platforms, lambda: build(df, platforms))
+            st.plotly_chart(figure, use_container_width=True)
+
+        with st.expander("Sampling weights per stratum (platforms | location)"):
+            st.caption(f"{len(sample_df):,} sampled rows; weight = population / sampled rows in the stratum.")
+            st.dataframe(sampling_report, use_container_width=True)
+
     elif selected_tab == "Dataset":
         st.subheader("Uploaded Dataset Preview")
         st.info("Below is the data from your uploaded CSV file.")
-        st.dataframe(df, use_container_width=True)
+
+        # The index covers the whole upload; a filtered view maps its rows onto it
+        search_index = get_dataset_index(dataset_hash, 'search_index', full_df, SearchIndex)
+        search_col, columns_col, mode_col = st.columns([3, 3, 1])
+        search_term = search_col.text_input("🔍 Search in data:", "")
+        search_columns = columns_col.multiselect("Columns", search_index.columns, placeholder="All text columns")
+        search_mode = 'prefix' if mode_col.checkbox("Prefix") else 'contains'
+
+        rows = None
+        if search_term:
+            view_rows = None if df is full_df else full_df.index.get_indexer(df.index)
+            rows = search_index.search(search_term, search_columns, search_mode, view_rows)
+
+        sort_col, order_col, size_col, page_col = st.columns([3, 1, 1, 1])
+        sort_column = sort_col.selectbox("Sort by", ["(none)"] + list(df.columns))
+        ascending = order_col.radio("Order", ["Asc", "Desc"], horizontal=True) == "Asc"
+        page_size = size_col.selectbox("Rows per page", TABLE_CONFIG["page_sizes"], index=TABLE_CONFIG["page_sizes"].index(TABLE_CONFIG["default_page_size"]))
+
+        ordered_rows = order_rows(df, rows, None if sort_column == "(none)" else sort_column, ascending)
+        n_pages = max(1, -(-len(ordered_rows) // page_size))
+        page = int(page_col.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1))
+        page_df, n_pages = get_page(df, ordered_rows, page, page_size)
+
+        start = (page - 1) * page_size
+        if len(page_df):
+            st.caption(
+                f"Showing rows {start + 1:,}-{start + len(page_df):,} of {len(ordered_rows):,}"
+                + (f" matching rows ({len(df):,} total)" if rows is not None else "")
+            )
+        else:
+            st.caption("No matching rows" + (f" ({len(df):,} total)" if rows is not None else ""))
+        st.dataframe(page_df, use_container_width=True)
+
+        # Export is generated only when the download button is clicked
+        format_col, gzip_col, download_col = st.columns([2, 1, 2])
+        export_format = format_col.selectbox("Export format", EXPORT_CONFIG["file_formats"])
+        compress = gzip_col.checkbox("gzip", disabled=export_format not in GZIP_FORMATS)
+        download_col.download_button(
+            label="📥 Download current view",
+            data=lambda: export_file(df, export_format, rows=ordered_rows, compress=compress),
+            file_name=export_file_name(f"filtered_user_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}", export_format, compress),
+            mime=export_mime_type(export_format, compress),
+            on_click="ignore"
+        )
+
+        with st.expander("Memory per column"):
+            report = memory_report(full_df)
+            total = report.loc['Total']
+            st.caption(
+                f"{total['before'] / 1e6:.2f} MB as parsed → {total['after'] / 1e6:.2f} MB loaded ({total['ratio']:.2f}x). "
+                "Before is each column as read_csv returned it (text as Arrow strings, numbers as float32)."
+            )
+            st.dataframe(report, use_container_width=True)
+
+    elif selected_tab == "Predict":
+        st.header("Batch Prediction")
+        st.info("Scores every uploaded row with the RandomForest model; the table and download follow the sidebar filters.")
+
+        try:
+            # The whole upload is scored once and the filtered view picks its rows
+            scores, stats = get_predictions(model_hash, dataset_hash, pipeline, full_df)
+        except Exception as e:
+            st.error(f"Error scoring dataset: {str(e)}")
+            st.stop()
+
+        view_scores = scores.loc[df.index]
+        st.caption(f"Scored {stats['rows']:,} rows in {stats['seconds']:.2f} s ({stats['rows_per_sec']:,.0f} rows/sec)")
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Rows", f"{len(view_scores):,}")
+        col2.metric("Predicted positive", f"{int((view_scores['prediction'] == pipeline.classes_[-1]).sum()):,}")
+        col3.metric("Mean probability", f"{view_scores['probability'].mean():.3f}" if len(view_scores) else "-")
+
+        counts, edges = np.histogram(view_scores['probability'], bins=20, range=(0, 1))
+        st.bar_chart(pd.Series(counts, index=[f"{low:.2f}" for low in edges[:-1]], name="rows"))
+
+        st.dataframe(pd.concat([df.head(TABLE_CONFIG["default_page_size"]), view_scores.head(TABLE_CONFIG["default_page_size"])], axis=1), use_container_width=True)
+
+        format_col, gzip_col, download_col = st.columns([2, 1, 2])
+        export_format = format_col.selectbox("Export format", EXPORT_CONFIG["file_formats"])
+        compress = gzip_col.checkbox("gzip", disabled=export_format not in GZIP_FORMATS)
+        download_col.download_button(
+            label="📥 Download scored data",
+            data=lambda: export_file(pd.concat([df, view_scores], axis=1), export_format, compress=compress),
+            file_name=export_file_name(f"scored_user_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}", export_format, compress),
+            mime=export_mime_type(export_format, compress),
+            on_click="ignore"
+        )
+
+    elif selected_tab == "ML Experiments" and os.path.exists(EXPERIMENT_CONFIG["results_path"]):
+        experiments = load_experiment_results(EXPERIMENT_CONFIG["results_path"], os.path.getmtime(EXPERIMENT_CONFIG["results_path"]))
+        results = pd.DataFrame(experiments['results'])
+        columns = ['model', 'pr_auc_pos', 'f1_pos', 'roc_auc', 'accuracy', 'cm_TN', 'cm_FP', 'cm_FN', 'cm_TP']
+
+        st.markdown("### ML Modeling & Experiment Tracking")
+        st.caption(
+            f"Generated {experiments['generated_at']} from {experiments['dataset']} "
+            f"({experiments['rows']['train']:,} train / {experiments['rows']['validation']:,} validation / {experiments['rows']['test']:,} test rows) "
+            f"in {experiments['wall_seconds']:.1f} s on {experiments['workers']} workers"
+        )
+
+        st.markdown("#### Validation comparison (per model)")
+        validation = results[results['split'] == 'validation'].sort_values('pr_auc_pos', ascending=False)
+        # Older results files predate the per-model n_jobs column
+        run_columns = [col for col in ['train_rows', 'n_jobs', 'fit_seconds'] if col in results.columns]
+        st.dataframe(validation[columns + run_columns], hide_index=True, use_container_width=True)
+
+        st.markdown(f"#### Test metrics (best model from validation: **{experiments['best_model']}**)")
+        test = results[results['split'] == 'test']
+        st.dataframe(test[test['model'] == experiments['best_model']][columns], hide_index=True, use_container_width=True)
+
+        with st.expander("Test metrics for every model"):
+            st.dataframe(test[columns], hide_index=True, use_container_width=True)
 
     elif selected_tab == "ML Experiments":
         st.markdown("""
@@ -200,7 +431,43 @@ if uploaded_file:
 
         ### SHAP Feature Contributions (RandomForestClassifier Result)
         """)
-        st.image("WhatsApp Image 2025-10-16 at 23.39.12_a6885adf.jpg", caption="SHAP Feature Contributions (RandomForestClassifier Result)", use_container_width=True)
+
+        try:
+            explanation = get_shap_values(model_hash, dataset_hash, pipeline, full_df)
+        except Exception as e:
+            st.error(f"Error computing SHAP values: {str(e)}")
+            st.image("WhatsApp Image 2025-10-16 at 23.39.12_a6885adf.jpg", caption="SHAP Feature Contributions (RandomForestClassifier Result)", use_container_width=True)
+            st.stop()
+
+        shap_values, features = explanation['values'], explanation['features']
+        st.caption(
+            f"Explained {len(features):,} rows against a {explanation['background_size']}-row background "
+            f"in {explanation['seconds']:.1f} s (base value {explanation['expected_value']:.3f})"
+        )
+
+        importance = pd.Series(np.abs(shap_values).mean(axis=0), index=features.columns).sort_values(ascending=False)
+        st.bar_chart(importance.rename("mean |SHAP|"))
+
+        # Plots are drawn from a fixed slice of the cached matrix and cached as images
+        plot_rows = SHAP_CONFIG["plot_rows"]
+        shap_key = (model_hash, dataset_hash)
+        st.image(
+            cached_image((shap_key, 'shap_summary'), lambda: shap.summary_plot(shap_values[:plot_rows], features.iloc[:plot_rows], show=False)),
+            caption="SHAP summary"
+        )
+
+        dependence_feature = st.selectbox("Dependence plot feature", list(importance.index))
+        st.image(
+            cached_image(
+                (shap_key, 'shap_dependence', dependence_feature),
+                lambda: shap.dependence_plot(dependence_feature, shap_values[:plot_rows], features.iloc[:plot_rows], interaction_index=None, show=False)
+            ),
+            caption=f"SHAP dependence: {dependence_feature}"
+        )
+
+    # Last, so the figure timings include the charts drawn on this run
+    show_cache_stats()
+    show_cache_stats(get_figure_cache(), "Figure cache")
 
 else:
     if selected_tab != "Problem":
@@ -24,7 +24,14 @@ CHART_CONFIG = {
     "default_height": 400,
     "color_palette": ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd"],
     "background_color": "white",
-    "grid_color": "#eeeeee"
+    "grid_color": "#eeeeee",
+    "timeline_max_sessions": 2000,
+    "timeline_buckets": 200,
+    "histogram_bins": 15,
+    "histogram_max_bins": 100,
+    # Bin strategy per field: 'fixed', 'fd' (Freedman-Diaconis) or 'log'
+    "histogram_strategies": {"age": "fixed", "followers": "log", "following": "log"},
+    "box_max_outliers": 500
 }
 
 # Data validation rules
@@ -48,11 +55,130 @@ DATA_VALIDATION = {
     ]
 }
 
+# Platform configuration: display name -> column suffix.
+# Adding a platform here adds it to every chart built from the long table.
+PLATFORMS = {
+    "User X": "x",
+    "User Y": "y",
+    "User Z": "z"
+}
+
+# Per-platform fields and their names in the long-format table
+PLATFORM_FIELDS = {
+    "username": "username",
+    "age": "age",
+    "location": "location",
+    "interest": "interest",
+    "date_of_login": "login",
+    "date_of_logout": "logout",
+    "followers": "followers",
+    "following": "following"
+}
+
 # User groups configuration
-USER_GROUPS = ["User X", "User Y", "User Z"]
+USER_GROUPS = list(PLATFORMS)
 
 # Export configuration
 EXPORT_CONFIG = {
-    "file_formats": ["csv", "xlsx", "json"],
-    "datetime_format": "%Y-%m-%d %H:%M:%S"
+    "file_formats": ["csv", "jsonl", "xlsx", "parquet"],
+    "datetime_format": "%Y-%m-%d %H:%M:%S",
+    "chunk_size": 50_000,
+    "spool_max_bytes": 32 * 1024 * 1024
+}
+
+# Upload cache configuration
+CACHE_CONFIG = {
+    "max_bytes": 512 * 1024 * 1024,
+    "figure_max_bytes": 64 * 1024 * 1024
+}
+
+# CSV loader configuration
+LOADER_CONFIG = {
+    "chunk_size": 100_000,
+    "numeric_dtype": "float32",
+    "max_category_ratio": 0.5
+}
+
+# Columnar sidecar cache configuration
+COLUMNAR_CONFIG = {
+    "cache_dir": ".columnar_cache",
+    "format": "feather",
+    # Upload sidecars beyond this many bytes are pruned, least recently used first
+    "max_upload_bytes": 1024 * 1024 * 1024
+}
+
+# KPI configuration
+METRICS_CONFIG = {
+    "period_days": 30
+}
+
+# Aggregate cube configuration
+AGGREGATE_CONFIG = {
+    "age_bins": [0, 18, 25, 35, 45, 55, 65, 200]
+}
+
+# Filter configuration
+FILTER_CONFIG = {
+    # Only the most frequent values of each dimension get a bitmap
+    "max_values": 200
+}
+
+# Sketch configuration
+SKETCH_CONFIG = {
+    # Counters kept per Space-Saving summary; top-N answers are exact while
+    # a column has fewer distinct values than this
+    "top_k_capacity": 256,
+    "top_n": 10,
+    # HyperLogLog registers are 2 ** hll_precision bytes; 14 gives ~0.8% error in 16 KB
+    "hll_precision": 14,
+    # Distinct counts stay exact until a column has more distinct values than
+    # this; the kept hashes are 8 bytes each, so at most 8 KB per sketch
+    "hll_exact_limit": 1024
+}
+
+# Model artifacts: the pipeline is preferred, the bare model plus encoder is the fallback
+MODEL_CONFIG = {
+    "forest_path": "model_forest.bin",
+    "pipeline_path": "model_pipeline.pkl",
+    "model_path": "model.pkl",
+    "encoder_path": "location_x_label_encoder.pkl"
+}
+
+# Experiment runner configuration
+EXPERIMENT_CONFIG = {
+    "dataset_path": "Final_social_media_data_labeled.csv",
+    "results_path": "experiment_results.json",
+    "val_size": 0.2,
+    "test_size": 0.2,
+    # RBF SVC with probability=True scales quadratically, so it trains on a subset
+    "svc_max_train_rows": 5_000,
+    "random_state": 42
+}
+
+# Live SHAP configuration
+SHAP_CONFIG = {
+    "background_size": 50,
+    # Larger uploads are explained on a seeded random subset of this many rows
+    "max_rows": 10_000,
+    "chunk_size": 1_000,
+    "n_jobs": -1,
+    "plot_rows": 2_000
+}
+
+# Batch prediction configuration
+PREDICT_CONFIG = {
+    "batch_size": 50_000
+}
+
+# Sampling configuration
+SAMPLING_CONFIG = {
+    "sample_size": 1000,
+    "min_per_stratum": 3,
+    "chunk_size": 100_000
+}
+
+# Dataset table configuration
+TABLE_CONFIG = {
+    "page_sizes": [25, 50, 100, 500],
+    "default_page_size": 50
 }
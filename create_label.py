@@ -1,6 +1,6 @@
-import pandas as pd
+from utils.columnar import read_csv_cached
 
-df = pd.read_csv('Final_social_media_data.csv')
+df = read_csv_cached('Final_social_media_data.csv')
 df['target'] = (df['followers_x'] > 1000).astype(int)  # Example label based on followers_x threshold
 df.to_csv('Final_social_media_data_labeled.csv', index=False)
 
@@ -0,0 +1,24 @@
+import os
+import pickle
+
+from config import MODEL_CONFIG
+from utils.features import pipeline_from_legacy
+from utils.forest import export_forest, load_forest
+
+# Convert the pickled pipeline (or model.pkl and its location encoder) into the
+# memory-mapped node-array artifact the dashboard loads first
+if os.path.exists(MODEL_CONFIG["pipeline_path"]):
+    with open(MODEL_CONFIG["pipeline_path"], 'rb') as f:
+        pipeline = pickle.load(f)
+else:
+    with open(MODEL_CONFIG["model_path"], 'rb') as f:
+        model = pickle.load(f)
+    with open(MODEL_CONFIG["encoder_path"], 'rb') as f:
+        encoder = pickle.load(f)
+    pipeline = pipeline_from_legacy(model, encoder)
+
+digest = export_forest(pipeline, MODEL_CONFIG["forest_path"])
+forest, _ = load_forest(MODEL_CONFIG["forest_path"])
+
+print(f"✅ Forest saved to {MODEL_CONFIG['forest_path']} ({os.path.getsize(MODEL_CONFIG['forest_path']):,} bytes)")
+print(f"Trees: {forest[-1].n_estimators}, sha256: {digest}")
@@ -0,0 +1,148 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, average_precision_score, confusion_matrix, f1_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC, LinearSVC
+
+from config import EXPERIMENT_CONFIG
+from utils.columnar import read_csv_cached
+from utils.dates import fix_duplicate_date_headers
+from utils.features import FeatureTransformer
+
+MODEL_NAMES = ["RandomForest", "LogisticRegression", "LinearSVC+Calibrated", "RBF SVC (prob=True)"]
+# Families that can use n_jobs: RandomForest builds trees in parallel and the
+# calibrated LinearSVC fits its cross-validation folds in parallel
+PARALLEL_MODELS = {"RandomForest", "LinearSVC+Calibrated"}
+
+
+def build_model(name, n_jobs, random_state):
+    """
+    Feature pipeline for one model family; linear and kernel models get
+    imputation and scaling in front. n_jobs only reaches PARALLEL_MODELS.
+    """
+    if name == "RandomForest":
+        return Pipeline([
+            ('features', FeatureTransformer()),
+            ('model', RandomForestClassifier(n_estimators=100, n_jobs=n_jobs, random_state=random_state))
+        ])
+
+    models = {
+        "LogisticRegression": LogisticRegression(max_iter=1000),
+        "LinearSVC+Calibrated": CalibratedClassifierCV(LinearSVC(random_state=random_state), n_jobs=n_jobs),
+        "RBF SVC (prob=True)": SVC(kernel='rbf', probability=True, random_state=random_state)
+    }
+    return Pipeline([
+        ('features', FeatureTransformer()),
+        ('impute', SimpleImputer(strategy='median', keep_empty_features=True)),
+        ('scale', StandardScaler()),
+        ('model', models[name])
+    ])
+
+
+def evaluate(y_true, probabilities, threshold=0.5):
+    """
+    PR-AUC, F1, ROC-AUC, accuracy and confusion counts for the positive class
+    """
+    predictions = (probabilities >= threshold).astype(int)
+    tn, fp, fn, tp = confusion_matrix(y_true, predictions, labels=[0, 1]).ravel()
+    both_classes = len(np.unique(y_true)) == 2
+
+    return {
+        'pr_auc_pos': float(average_precision_score(y_true, probabilities)) if both_classes else None,
+        'f1_pos': float(f1_score(y_true, predictions, zero_division=0)),
+        'roc_auc': float(roc_auc_score(y_true, probabilities)) if both_classes else None,
+        'accuracy': float(accuracy_score(y_true, predictions)),
+        'cm_TN': int(tn), 'cm_FP': int(fp), 'cm_FN': int(fn), 'cm_TP': int(tp)
+    }
+
+
+def run_experiment(name, splits, n_jobs, random_state):
+    """
+    Fit one model family on the training split and score validation and test
+    """
+    (X_train, y_train), validation, test = splits
+    if name.startswith("RBF SVC") and len(X_train) > EXPERIMENT_CONFIG["svc_max_train_rows"]:
+        X_train, _, y_train, _ = train_test_split(
+            X_train, y_train, train_size=EXPERIMENT_CONFIG["svc_max_train_rows"],
+            stratify=y_train, random_state=random_state
+        )
+
+    n_jobs = n_jobs if name in PARALLEL_MODELS else 1
+    start = time.perf_counter()
+    model = build_model(name, n_jobs, random_state).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    results = []
+    for split, (X, y) in [('validation', validation), ('test', test)]:
+        metrics = evaluate(y.to_numpy(), model.predict_proba(X)[:, 1])
+        results.append({'model': name, 'split': split, 'train_rows': len(X_train), 'n_jobs': n_jobs, 'fit_seconds': fit_seconds, **metrics})
+    return results
+
+
+def split_dataset(df, random_state):
+    X = df.drop(columns=['target'])
+    y = df['target']
+    holdout = EXPERIMENT_CONFIG["val_size"] + EXPERIMENT_CONFIG["test_size"]
+
+    X_train, X_rest, y_train, y_rest = train_test_split(X, y, test_size=holdout, stratify=y, random_state=random_state)
+    X_val, X_test, y_val, y_test = train_test_split(
+        X_rest, y_rest, test_size=EXPERIMENT_CONFIG["test_size"] / holdout, stratify=y_rest, random_state=random_state
+    )
+    return (X_train, y_train), (X_val, y_val), (X_test, y_test)
+
+
+def run_all(path=None, workers=None):
+    """
+    Train every model family concurrently and return the results document
+    """
+    path = path or EXPERIMENT_CONFIG["dataset_path"]
+    random_state = EXPERIMENT_CONFIG["random_state"]
+    cores = os.cpu_count() or 1
+    workers = workers or min(len(MODEL_NAMES), cores)
+    # Split the cores between the pool and the parallel models' own jobs
+    n_jobs = max(1, cores // workers)
+
+    df = read_csv_cached(path)
+    df.columns = fix_duplicate_date_headers(df.columns)
+    splits = split_dataset(df, random_state)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_experiment, name, splits, n_jobs, random_state) for name in MODEL_NAMES]
+        results = [row for future in futures for row in future.result()]
+    wall_seconds = time.perf_counter() - start
+
+    validation = [row for row in results if row['split'] == 'validation']
+    best = max(validation, key=lambda row: -1 if row['pr_auc_pos'] is None else row['pr_auc_pos'])['model']
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'dataset': path,
+        'rows': {split: len(y) for split, (_, y) in zip(['train', 'validation', 'test'], splits)},
+        'workers': workers,
+        'wall_seconds': wall_seconds,
+        'best_model': best,
+        'results': results
+    }
+
+
+if __name__ == "__main__":
+    document = run_all()
+    with open(EXPERIMENT_CONFIG["results_path"], 'w') as f:
+        json.dump(document, f, indent=2)
+
+    print(f"✅ {len(MODEL_NAMES)} models trained in {document['wall_seconds']:.1f} s "
+          f"({document['workers']} workers; n_jobs per model in the results)")
+    print(f"Best model on validation PR-AUC: {document['best_model']}")
+    print(f"Results saved to {EXPERIMENT_CONFIG['results_path']}")
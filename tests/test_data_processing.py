@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_processing import count_distinct
+
+
+def test_count_distinct_empty_frame():
+    df = pd.DataFrame({'email': pd.Series(dtype='string'), 'username_x': pd.Series(dtype='string')})
+
+    assert count_distinct(df, 'username_x') == 0
+    assert count_distinct(df, 'username_x', exact=True) == 0
+    assert count_distinct(df, 'email') == 0
+
+
+def test_count_distinct_filtered_to_no_rows():
+    df = pd.DataFrame({'username_x': ['a', 'b', 'a', None]})
+
+    assert count_distinct(df, 'username_x') == 2
+    assert count_distinct(df.iloc[[]], 'username_x') == 0
@@ -1,62 +1,32 @@
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
+from config import MODEL_CONFIG
+from utils.columnar import read_csv_cached
+from utils.dates import fix_duplicate_date_headers
+from utils.features import build_pipeline
+from utils.forest import export_forest
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 import pickle
-import numpy as np
 
 # Load dataset
-df = pd.read_csv('Final_social_media_data_labeled.csv')
-
-# Encode 'location_x'
-encoder = LabelEncoder()
-encoder.fit(df['location_x'])
-with open('location_x_label_encoder.pkl', 'wb') as f:
-    pickle.dump(encoder, f)
-print("✅ Saved location_x_label_encoder.pkl")
-
-df['location_x_encoded'] = encoder.transform(df['location_x'])
-
-# Date columns list
-date_cols = [
-    'date_of_login_x', 'date_of_logout_x',
-    'date_of_login_y', 'date_of_logout_y',
-    'date_of_login_x', 'date_of_logout_z'
-]
-
-# Convert dates to numeric timestamps, fill missing with 0
-for col in date_cols:
-    if col in df.columns:
-        df[col] = pd.to_datetime(df[col], errors='coerce').astype(np.int64) // 10**9
-        df[col] = df[col].fillna(0).astype(int)
-
-# Drop non-numeric columns except encoded and date columns
-drop_cols = [
-    'email', 'username_x', 'username_y', 'username_z',
-    'location_x', 'location_y', 'location_z',
-    'interest_x', 'interest_y', 'interest_z'
-]
-
-# Create features X
-X = df.drop(columns=drop_cols + ['target'])
-X['location_x_encoded'] = df['location_x_encoded']
-
-# Drop any column in X that may still have non-numeric types just in case
-for col in X.columns:
-    if X[col].dtype == 'object':
-        print(f"Dropping non-numeric column: {col}")
-        X = X.drop(columns=[col])
+df = read_csv_cached('Final_social_media_data_labeled.csv')
+df.columns = fix_duplicate_date_headers(df.columns)
 
+# Raw columns go in: the pipeline label-encodes location_x, turns dates into
+# epoch seconds and drops identifiers exactly as the dashboard will
+X = df.drop(columns=['target'])
 y = df['target']
 
 X_train, X_test, y_train, y_test = train_test_split(X, y, random_state=42)
 
-clf = RandomForestClassifier(n_estimators=100, random_state=42)
-clf.fit(X_train, y_train)
+pipeline = build_pipeline(RandomForestClassifier(n_estimators=100, random_state=42))
+pipeline.fit(X_train, y_train)
+
+with open(MODEL_CONFIG["pipeline_path"], 'wb') as f:
+    pickle.dump(pipeline, f)
 
-with open('model.pkl', 'wb') as f:
-    pickle.dump(clf, f)
+export_forest(pipeline, MODEL_CONFIG["forest_path"])
 
-print("✅ Model and encoder saved")
-print(f"Train accuracy: {clf.score(X_train, y_train):.4f}")
-print(f"Test accuracy: {clf.score(X_test, y_test):.4f}")
+print(f"✅ Pipeline saved to {MODEL_CONFIG['pipeline_path']} and {MODEL_CONFIG['forest_path']}")
+print(f"Features: {list(pipeline.named_steps['features'].get_feature_names_out())}")
+print(f"Train accuracy: {pipeline.score(X_train, y_train):.4f}")
+print(f"Test accuracy: {pipeline.score(X_test, y_test):.4f}")
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils.data_processing import get_user_data_by_type, calculate_metrics
+from config import USER_GROUPS
+from utils.data_processing import get_user_data_by_type, calculate_metrics, get_long_table
 from utils.visualizations import create_user_comparison_chart, create_session_duration_chart
 
 def show_user_analytics():
@@ -18,8 +19,8 @@ def show_user_analytics():
     # User selection
     users_to_analyze = st.multiselect(
         "Select users for detailed analysis:",
-        ["User X", "User Y", "User Z"],
-        default=["User X", "User Y", "User Z"]
+        USER_GROUPS,
+        default=USER_GROUPS
     )
 
     if not users_to_analyze:
@@ -60,37 +61,35 @@ def show_user_analytics():
     # User summary table
     st.subheader("📋 User Summary")
 
+    long_df = get_long_table(df)
+    long_df = long_df[long_df['platform'].isin(users_to_analyze)]
+    grouped = long_df.groupby('platform', observed=True)
+
+    def _mode(values):
+        modes = values.mode()
+        return modes.iloc[0] if not modes.empty else "N/A"
+
+    stats = grouped.agg(
+        username=('username', 'first'),
+        avg_age=('age', 'mean'),
+        top_location=('location', _mode),
+        top_interest=('interest', _mode),
+        followers=('followers', 'sum'),
+        following=('following', 'sum')
+    )
+
     summary_data = []
     for user in users_to_analyze:
-        suffix = user.split()[-1].lower()
-
-        # Get user data
-        username_col = f"username_{suffix}"
-        age_col = f"age_{suffix}"
-        location_col = f"location_{suffix}"
-        interest_col = f"interest_{suffix}"
-        followers_col = f"followers_{suffix}"
-        following_col = f"following_{suffix}"
-
         user_summary = {"User": user}
 
-        if username_col in df.columns:
-            user_summary["Username"] = df[username_col].iloc[0] if not df[username_col].empty else "N/A"
-
-        if age_col in df.columns:
-            user_summary["Avg Age"] = f"{df[age_col].mean():.1f}" if not df[age_col].isna().all() else "N/A"
-
-        if location_col in df.columns:
-            user_summary["Top Location"] = df[location_col].mode().iloc[0] if not df[location_col].empty else "N/A"
-
-        if interest_col in df.columns:
-            user_summary["Top Interest"] = df[interest_col].mode().iloc[0] if not df[interest_col].empty else "N/A"
-
-        if followers_col in df.columns:
-            user_summary["Total Followers"] = f"{df[followers_col].sum():,}"
-
-        if following_col in df.columns:
-            user_summary["Total Following"] = f"{df[following_col].sum():,}"
+        if user in stats.index:
+            row = stats.loc[user]
+            user_summary["Username"] = row['username'] if pd.notna(row['username']) else "N/A"
+            user_summary["Avg Age"] = f"{row['avg_age']:.1f}" if pd.notna(row['avg_age']) else "N/A"
+            user_summary["Top Location"] = row['top_location']
+            user_summary["Top Interest"] = row['top_interest']
+            user_summary["Total Followers"] = f"{row['followers']:,.0f}"
+            user_summary["Total Following"] = f"{row['following']:,.0f}"
 
         summary_data.append(user_summary)
 
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from config import AGGREGATE_CONFIG, CHART_CONFIG
+
+CUBE_DIMENSIONS = ['platform', 'location', 'interest', 'age']
+CUBE_MEASURES = ['count', 'age_count', 'age_sum', 'followers', 'following']
+
+
+def build_aggregate_cube(long_df):
+    """
+    Aggregate the long table to one row per (platform, location, interest, age)
+
+    Every measure is additive, so any chart over a subset of the dimensions
+    is a sum over the cube rather than a scan of the raw rows.
+    """
+    frame = pd.DataFrame({
+        'platform': long_df['platform'],
+        'location': long_df['location'],
+        'interest': long_df['interest'],
+        'age': np.floor(pd.to_numeric(long_df['age'], errors='coerce')),
+        'age_count': long_df['age'].notna().astype('int64'),
+        'age_sum': pd.to_numeric(long_df['age'], errors='coerce').fillna(0).astype('float64'),
+        'followers': pd.to_numeric(long_df['followers'], errors='coerce').fillna(0).astype('float64'),
+        'following': pd.to_numeric(long_df['following'], errors='coerce').fillna(0).astype('float64')
+    })
+
+    cube = frame.groupby(CUBE_DIMENSIONS, observed=True, dropna=False).agg(
+        count=('age_count', 'size'),
+        age_count=('age_count', 'sum'),
+        age_sum=('age_sum', 'sum'),
+        followers=('followers', 'sum'),
+        following=('following', 'sum')
+    )
+
+    return cube.reset_index()
+
+
+def age_buckets(ages, bins=None):
+    """
+    Bucket ages into the configured ranges, labelled like '18-24'
+    """
+    bins = bins or AGGREGATE_CONFIG["age_bins"]
+    labels = [f"{low}-{high - 1}" for low, high in zip(bins[:-1], bins[1:])]
+    return pd.cut(pd.to_numeric(ages, errors='coerce'), bins=bins, labels=labels, right=False)
+
+
+def add_age_bucket(cube, bins=None):
+    """
+    Label each cube row with its configured age bucket
+    """
+    cube = cube.copy()
+    cube['age_bucket'] = age_buckets(cube['age'], bins)
+    return cube
+
+
+def rollup(cube, dims, where=None):
+    """
+    Sum the cube measures over dims, after restricting dimensions to the
+    values listed in where ({dimension: value or list of values})
+    """
+    if 'age_bucket' in dims or (where and 'age_bucket' in where):
+        cube = add_age_bucket(cube)
+
+    for dim, values in (where or {}).items():
+        values = values if isinstance(values, (list, tuple, set, pd.Index)) else [values]
+        cube = cube[cube[dim].isin(values)]
+
+    result = cube.groupby(dims, observed=True, dropna=False)[CUBE_MEASURES].sum()
+    result['avg_age'] = result['age_sum'] / result['age_count'].where(result['age_count'] > 0)
+
+    return result
+
+
+def top_values(cube, dim, n=10, where=None):
+    """
+    Counts for the n most frequent non-missing values of dim
+    """
+    counts = rollup(cube, [dim], where)['count']
+    counts = counts[counts.index.notna()]
+    return counts.nlargest(n)
+
+
+def histogram_edges(values, strategy='fixed', bins=None, max_bins=None):
+    """
+    Bin edges for values under a strategy:
+
+    - 'fixed': bins equal-width bins over the value range
+    - 'fd': Freedman-Diaconis widths, capped at max_bins
+    - 'log': bins log-spaced edges over the positive values, for heavy
+      tailed counts such as followers
+    """
+    bins = bins or CHART_CONFIG["histogram_bins"]
+    max_bins = max_bins or CHART_CONFIG["histogram_max_bins"]
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+
+    if len(values) == 0:
+        return np.array([0.0, 1.0])
+
+    if strategy == 'log':
+        positive = values[values > 0]
+        low = positive.min() if len(positive) else 1.0
+        high = max(values.max(), low * 10)
+        return np.geomspace(low, high, bins + 1)
+
+    if strategy == 'fd':
+        edges = np.histogram_bin_edges(values, bins='fd')
+        if len(edges) - 1 <= max_bins:
+            return edges
+        bins = max_bins
+    elif strategy != 'fixed':
+        raise ValueError(f"Unknown histogram strategy: {strategy}")
+
+    return np.histogram_bin_edges(values, bins=bins)
+
+
+def histogram(values, edges):
+    """
+    Counts of values per bin; values outside the edges (e.g. zero followers
+    under log edges) count in the end bins
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+    counts, _ = np.histogram(np.clip(values, edges[0], edges[-1]), bins=edges)
+    return counts
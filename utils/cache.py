@@ -0,0 +1,295 @@
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from config import CACHE_CONFIG
+from utils.columnar import read_upload_cached
+from utils.sampling import sample_frame
+from utils.dates import fix_duplicate_date_headers
+
+logger = logging.getLogger(__name__)
+
+def content_hash(data):
+    """
+    Return a stable hex digest for the raw bytes of an uploaded file
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def estimate_size(value):
+    """
+    Estimate the in-memory size of a cached value in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if hasattr(value, 'nbytes'):
+        # numpy arrays and derived indexes that report their own size
+        return int(value.nbytes)
+    return 64
+
+
+class LRUCache:
+    """
+    Size-bounded least-recently-used cache with hit/miss counters
+    """
+
+    def __init__(self, max_bytes, sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+
+            # Values larger than the whole budget are returned but never stored
+            if size > self.max_bytes:
+                return value
+
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+        return value
+
+    def record_timing(self, kind, seconds):
+        """
+        Note how long one cache operation of a kind (e.g. 'build', 'hit') took
+        """
+        with self._lock:
+            count, total, _ = self._timings.get(kind, (0, 0.0, 0.0))
+            self._timings[kind] = (count + 1, total + seconds, seconds)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'timings': {
+                    kind: {'count': count, 'mean_ms': total / count * 1000, 'last_ms': last * 1000}
+                    for kind, (count, total, last) in self._timings.items()
+                }
+            }
+
+
+@st.cache_resource
+def get_dataset_cache():
+    """
+    Process-wide cache of parsed uploads shared by every session and rerun
+    """
+    return LRUCache(CACHE_CONFIG["max_bytes"])
+
+
+def get_upload_hash(uploaded_file):
+    """
+    Hash an uploaded file once per upload and remember it for later reruns
+    """
+    hashes = st.session_state.setdefault('_upload_hashes', {})
+    file_id = getattr(uploaded_file, 'file_id', None)
+
+    if file_id is not None and file_id in hashes:
+        return hashes[file_id]
+
+    digest = content_hash(uploaded_file.getvalue())
+    if file_id is not None:
+        hashes[file_id] = digest
+    return digest
+
+
+def load_uploaded_csv(uploaded_file, sample_size, random_state=42):
+    """
+    Return (dataset_hash, df, sample_df, sampling_report) for an upload,
+    parsing it only on a cache miss.
+
+    The sample is a stratified reservoir sample drawn from the cached frame,
+    cached on its own so changing the sample size does not re-parse.
+    """
+    cache = get_dataset_cache()
+    dataset_hash = get_upload_hash(uploaded_file)
+
+    df = cache.get((dataset_hash, 'frame'))
+    if df is None:
+        df = read_upload_cached(uploaded_file.getvalue(), dataset_hash)
+        df.columns = fix_duplicate_date_headers(df.columns)
+        cache.put((dataset_hash, 'frame'), df)
+
+    sample_key = (dataset_hash, 'sample', sample_size, random_state)
+    sampled = cache.get(sample_key)
+    if sampled is None:
+        sampled = cache.put(sample_key, sample_frame(df, sample_size, random_state=random_state))
+    sample_df, sampling_report = sampled
+
+    return dataset_hash, df, sample_df, sampling_report
+
+
+def get_dataset_index(dataset_hash, name, df, build):
+    """
+    Return build(df) for a whole dataset, built once and kept in the dataset
+    cache so its size counts against the same byte budget as the frames
+    """
+    cache = get_dataset_cache()
+    key = (dataset_hash, 'index', name)
+
+    index = cache.get(key)
+    if index is None:
+        index = cache.put(key, build(df))
+
+    return index
+
+
+def get_filtered_view(dataset_hash, df, sample_df, view_key, select_rows):
+    """
+    Return (view_df, sample_view) restricted to the positional rows chosen by
+    select_rows(), cached per (dataset, view_key) so the views keep their
+    identity, and their derived indexes, across reruns
+    """
+    cache = get_dataset_cache()
+    key = (dataset_hash, 'view', view_key)
+
+    cached = cache.get(key)
+    if cached is None:
+        rows = select_rows()
+        if len(rows) == len(df):
+            # Nothing filtered out: reuse the cached frames instead of storing copies
+            return df, sample_df
+
+        view_df = df.iloc[rows]
+        # Sample rows keep the labels of the frame they were drawn from
+        sample_view = sample_df[sample_df.index.isin(view_df.index)]
+        cached = cache.put(key, (view_df, sample_view))
+
+    return cached
+
+
+@st.cache_resource
+def get_figure_cache():
+    """
+    Process-wide cache of serialized Plotly figures
+    """
+    return LRUCache(CACHE_CONFIG["figure_max_bytes"])
+
+
+def cached_figure(dataset_key, chart_type, users, build):
+    """
+    Return a chart as a Plotly figure, calling build() only when no figure
+    is cached for (dataset_key, chart_type, users).
+
+    dataset_key identifies the dataset and filter state the chart is drawn
+    from. Figures are stored as JSON, so the byte budget counts what is
+    actually kept.
+    """
+    cache = get_figure_cache()
+    key = (dataset_key, chart_type, tuple(users))
+    start = time.perf_counter()
+
+    fig_json = cache.get(key)
+    hit = fig_json is not None
+    if not hit:
+        fig_json = cache.put(key, build().to_json())
+    # The JSON was produced by a validated figure, so skip validating it again
+    figure = go.Figure(json.loads(fig_json), _validate=False)
+
+    elapsed = time.perf_counter() - start
+    cache.record_timing('hit' if hit else 'build', elapsed)
+    if hit:
+        logger.info("Figure cache hit for %s in %.1f ms", chart_type, elapsed * 1000)
+    else:
+        logger.info("Built %s figure in %.1f ms (%d bytes)", chart_type, elapsed * 1000, len(fig_json))
+
+    return figure
+
+
+def cached_image(key, draw):
+    """
+    Return PNG bytes for key from the figure cache, rendering the current
+    matplotlib figure after draw() only on a miss
+    """
+    cache = get_figure_cache()
+    png = cache.get(key)
+    if png is None:
+        import matplotlib.pyplot as plt
+
+        start = time.perf_counter()
+        draw()
+        buffer = io.BytesIO()
+        plt.gcf().savefig(buffer, format='png', bbox_inches='tight', dpi=100)
+        plt.close('all')
+        png = cache.put(key, buffer.getvalue())
+        elapsed = time.perf_counter() - start
+        cache.record_timing('render', elapsed)
+        logger.info("Rendered %s in %.1f ms (%d bytes)", key[1], elapsed * 1000, len(png))
+    return png
+
+
+def show_cache_stats(cache=None, label="Dataset cache"):
+    """
+    Render cache hit/miss counters, and any recorded timings, in the sidebar
+    """
+    stats = (cache if cache is not None else get_dataset_cache()).stats()
+    timings = "".join(
+        f" · {kind} {timing['last_ms']:.1f} ms (avg {timing['mean_ms']:.1f} over {timing['count']})"
+        for kind, timing in stats['timings'].items()
+    )
+    st.sidebar.caption(
+        f"{label}: {stats['hits']} hits / {stats['misses']} misses · "
+        f"{stats['entries']} cached ({stats['bytes'] / 1024 ** 2:.1f} of "
+        f"{stats['max_bytes'] / 1024 ** 2:.0f} MB){timings}"
+    )
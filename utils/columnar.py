@@ -0,0 +1,181 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from config import COLUMNAR_CONFIG
+from utils.data_processing import read_typed_csv
+
+_FINGERPRINT_KEY = b'source_fingerprint'
+_HASH_KEY = b'source_sha256'
+_OPTIONS_KEY = b'read_options'
+# Upload sidecars written by an older loader are re-parsed rather than trusted
+_UPLOAD_LOADER = b'typed-chunks-v1'
+
+
+def _file_sha256(path, block_size=1 << 20):
+    """
+    Hash a file on disk without loading it into memory
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def sidecar_path(name, fmt=None, cache_dir=None):
+    """
+    Location of the columnar sidecar for a dataset name or content hash
+    """
+    fmt = fmt or COLUMNAR_CONFIG["format"]
+    cache_dir = cache_dir or COLUMNAR_CONFIG["cache_dir"]
+    return os.path.join(cache_dir, f"{os.path.basename(name)}.{fmt}")
+
+
+def _read_schema(path, fmt):
+    if fmt == 'parquet':
+        return pq.read_schema(path, memory_map=True)
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).schema
+
+
+def _read_table(path, fmt, columns=None):
+    if columns is not None:
+        available = set(_read_schema(path, fmt).names)
+        columns = [col for col in columns if col in available]
+    if fmt == 'parquet':
+        return pq.read_table(path, columns=columns, memory_map=True)
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def write_sidecar(df, path, fmt=None, metadata=None):
+    """
+    Write a frame as a typed Parquet/Feather file, atomically
+    """
+    fmt = fmt or COLUMNAR_CONFIG["format"]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if fmt == 'parquet':
+        pq.write_table(table, tmp_path)
+    else:
+        # Uncompressed Arrow IPC so later reads can be memory-mapped
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def _select_columns(df, columns):
+    return df if columns is None else df[[col for col in columns if col in df.columns]]
+
+
+def read_csv_cached(path, columns=None, fmt=None, cache_dir=None, **read_csv_kwargs):
+    """
+    Read a CSV through a columnar sidecar.
+
+    The first read parses the CSV and writes the sidecar; later reads load only
+    the requested columns from it. The sidecar is reused while the source size
+    and mtime are unchanged, or while its content hash still matches, and only
+    for the same read_csv keyword arguments.
+    """
+    fmt = fmt or COLUMNAR_CONFIG["format"]
+    target = sidecar_path(path, fmt, cache_dir)
+    fingerprint = _fingerprint(path)
+    options = repr(sorted(read_csv_kwargs.items())).encode()
+
+    if os.path.exists(target):
+        try:
+            metadata = _read_schema(target, fmt).metadata or {}
+            stored_fingerprint = metadata.get(_FINGERPRINT_KEY, b'').decode()
+            valid = metadata.get(_OPTIONS_KEY) == options and stored_fingerprint == fingerprint
+            if not valid and metadata.get(_OPTIONS_KEY) == options and _HASH_KEY in metadata:
+                valid = metadata[_HASH_KEY].decode() == _file_sha256(path)
+            if valid:
+                return _read_table(target, fmt, columns).to_pandas()
+        except (OSError, pa.ArrowException):
+            # A corrupt or partial sidecar is simply rebuilt
+            pass
+
+    df = pd.read_csv(path, **read_csv_kwargs)
+    try:
+        write_sidecar(df, target, fmt, metadata={
+            _FINGERPRINT_KEY: fingerprint.encode(),
+            _HASH_KEY: _file_sha256(path).encode(),
+            _OPTIONS_KEY: options
+        })
+    except (OSError, pa.ArrowException):
+        pass
+
+    return _select_columns(df, columns)
+
+
+def prune_uploads(cache_dir, max_bytes, keep=None):
+    """
+    Delete the least recently used upload sidecars until the directory
+    fits in max_bytes; keep is never deleted
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.samefile(path, keep):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def read_upload_cached(data, dataset_hash, columns=None, fmt=None, cache_dir=None, max_bytes=None):
+    """
+    Read uploaded CSV bytes through a sidecar keyed on their content hash.
+
+    A miss parses the upload with the typed chunked loader, so the sidecar
+    keeps parsed dates and compacted text. Sidecars are touched on every
+    read and the least recently used ones are pruned past max_bytes.
+    """
+    fmt = fmt or COLUMNAR_CONFIG["format"]
+    cache_dir = os.path.join(cache_dir or COLUMNAR_CONFIG["cache_dir"], 'uploads')
+    max_bytes = max_bytes or COLUMNAR_CONFIG["max_upload_bytes"]
+    target = sidecar_path(dataset_hash, fmt, cache_dir)
+
+    if os.path.exists(target):
+        try:
+            if (_read_schema(target, fmt).metadata or {}).get(_OPTIONS_KEY) == _UPLOAD_LOADER:
+                df = _read_table(target, fmt, columns).to_pandas()
+                os.utime(target)
+                return df
+        except (OSError, pa.ArrowException):
+            pass
+
+    df = read_typed_csv(io.BytesIO(data))
+    try:
+        write_sidecar(df, target, fmt, metadata={_OPTIONS_KEY: _UPLOAD_LOADER})
+        prune_uploads(cache_dir, max_bytes, keep=target)
+    except (OSError, pa.ArrowException):
+        pass
+
+    return _select_columns(df, columns)
@@ -0,0 +1,591 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+import weakref
+
+from config import CHART_CONFIG, DATA_VALIDATION, LOADER_CONFIG, METRICS_CONFIG, PLATFORMS, PLATFORM_FIELDS, SKETCH_CONFIG
+from utils.dates import parse_dates, fix_duplicate_date_headers
+from utils.aggregates import build_aggregate_cube, rollup
+from utils.sketches import build_distinct_sketches, build_top_k_sketches
+
+STRING_DTYPE = pd.StringDtype('pyarrow')
+
+# Per-platform text fields that are candidates for a shared categorical dictionary
+CATEGORY_FIELDS = ['location', 'interest', 'username']
+
+def build_dtype_map(numeric_dtype=None):
+    """
+    Build an explicit read_csv dtype map from config.DATA_VALIDATION
+    """
+    numeric_dtype = numeric_dtype or LOADER_CONFIG["numeric_dtype"]
+    numeric_columns = set(DATA_VALIDATION["numeric_columns"])
+    date_columns = set(DATA_VALIDATION["date_columns"])
+
+    dtype_map = {}
+    for col in DATA_VALIDATION["required_columns"]:
+        if col in numeric_columns:
+            dtype_map[col] = numeric_dtype
+        else:
+            # Text and date columns are read as strings; dates are coerced per chunk
+            dtype_map[col] = str
+    for col in date_columns:
+        dtype_map[col] = str
+
+    return dtype_map
+
+def _coerce_chunk(chunk, numeric_dtype, raw_memory=None, date_report=None):
+    """
+    Coerce one chunk in place to its final dtypes
+    """
+    if raw_memory is not None:
+        for col, nbytes in chunk.memory_usage(deep=True, index=False).items():
+            raw_memory[col] = raw_memory.get(col, 0) + int(nbytes)
+
+    typed_columns = set(DATA_VALIDATION["date_columns"]) | set(DATA_VALIDATION["numeric_columns"])
+    for col in chunk.columns:
+        if col not in typed_columns and chunk[col].dtype != STRING_DTYPE:
+            chunk[col] = chunk[col].astype(STRING_DTYPE)
+
+    date_report = date_report if date_report is not None else {}
+    for col in DATA_VALIDATION["date_columns"]:
+        if col in chunk.columns:
+            # The format detected on the first chunk is reused for the rest
+            state = date_report.setdefault(col, {'format': None, 'coerced': 0})
+            chunk[col], info = parse_dates(chunk[col], state['format'])
+            state['format'] = state['format'] or info['format']
+            state['coerced'] += info['coerced']
+
+    for col in DATA_VALIDATION["numeric_columns"]:
+        if col in chunk.columns and chunk[col].dtype != numeric_dtype:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(numeric_dtype)
+
+    return chunk.dropna(how='all')
+
+def _read_chunks(source, dtype_map, chunk_size, numeric_dtype, raw_memory=None, date_report=None, names=None, skip=0):
+    """
+    Yield coerced chunks from a CSV source, passing over the first skip
+    chunks without coercing or accounting for them
+    """
+    header_options = {'header': 0, 'names': names} if names is not None else {}
+    reader = pd.read_csv(source, dtype=dtype_map, chunksize=chunk_size, **header_options)
+    for i, chunk in enumerate(reader):
+        if i >= skip:
+            yield _coerce_chunk(chunk, numeric_dtype, raw_memory, date_report)
+
+def _read_header(source):
+    """
+    Read and repair the header of a seekable source, then rewind it
+    """
+    if not hasattr(source, 'seek'):
+        return None
+
+    columns = list(pd.read_csv(source, nrows=0).columns)
+    source.seek(0)
+    fixed = fix_duplicate_date_headers(columns)
+
+    return fixed if fixed != columns else None
+
+def iter_processed_chunks(uploaded_file, chunk_size=None, numeric_dtype=None, raw_memory=None, date_report=None):
+    """
+    Stream an uploaded CSV as typed, cleaned chunks.
+
+    Numeric columns are parsed straight to numeric_dtype by the C parser. If a
+    numeric column holds non-numeric text the file is re-read with that block
+    as strings and coerced to NaN, matching the previous errors='coerce'.
+    """
+    chunk_size = chunk_size or LOADER_CONFIG["chunk_size"]
+    numeric_dtype = numeric_dtype or LOADER_CONFIG["numeric_dtype"]
+    dtype_map = build_dtype_map(numeric_dtype)
+    names = _read_header(uploaded_file)
+
+    yielded = 0
+    try:
+        for chunk in _read_chunks(uploaded_file, dtype_map, chunk_size, numeric_dtype, raw_memory, date_report, names):
+            yield chunk
+            yielded += 1
+        return
+    except ValueError:
+        if not hasattr(uploaded_file, 'seek'):
+            raise
+
+    # Chunk boundaries are row-based, so skip the chunks already yielded; they
+    # were already counted in raw_memory and date_report
+    uploaded_file.seek(0)
+    for col in DATA_VALIDATION["numeric_columns"]:
+        dtype_map[col] = str
+    yield from _read_chunks(uploaded_file, dtype_map, chunk_size, numeric_dtype, raw_memory, date_report, names, skip=yielded)
+
+def _assemble_frame(chunks, raw_memory, date_report):
+    """
+    Concatenate typed chunks and compact their text columns
+    """
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0].reset_index(drop=True)
+    df = compact_string_columns(df)
+    df.attrs['raw_memory'] = raw_memory
+    df.attrs['date_report'] = date_report
+    return df
+
+def read_typed_csv(source, chunk_size=None, numeric_dtype=None):
+    """
+    Parse a CSV source into one typed frame: numbers as numeric_dtype, dates
+    parsed, text compacted. Raises ValueError if the file has no rows.
+    """
+    raw_memory = {}
+    date_report = {}
+    chunks = list(iter_processed_chunks(source, chunk_size, numeric_dtype, raw_memory, date_report))
+    if not any(len(chunk) for chunk in chunks):
+        raise ValueError("The uploaded file contains no rows")
+    return _assemble_frame(chunks, raw_memory, date_report)
+
+def load_and_process_data(uploaded_file, chunk_size=None):
+    """
+    Load and process the uploaded CSV file in typed chunks
+    """
+    try:
+        if hasattr(uploaded_file, 'seek'):
+            uploaded_file.seek(0)
+
+        chunks = []
+        raw_memory = {}
+        date_report = {}
+        for chunk in iter_processed_chunks(uploaded_file, chunk_size, raw_memory=raw_memory, date_report=date_report):
+            if not chunks:
+                # Validate required columns on the first chunk
+                missing_columns = [col for col in DATA_VALIDATION["required_columns"] if col not in chunk.columns]
+                if missing_columns:
+                    st.error(f"Missing required columns: {missing_columns}")
+                    return None
+            chunks.append(chunk)
+
+        if not any(len(chunk) for chunk in chunks):
+            st.error("The uploaded file contains no rows")
+            return None
+
+        df = _assemble_frame(chunks, raw_memory, date_report)
+        del chunks
+
+        coerced = {col: info['coerced'] for col, info in date_report.items() if info['coerced']}
+        if coerced:
+            st.warning(f"Unparseable dates set to missing: {coerced}")
+
+        return df
+
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
+        return None
+
+def compact_string_columns(df, max_category_ratio=None):
+    """
+    Store low-cardinality text fields as categoricals sharing one dictionary
+    across their x/y/z variants; everything else stays Arrow-backed strings
+    """
+    max_category_ratio = max_category_ratio or LOADER_CONFIG["max_category_ratio"]
+
+    for field in CATEGORY_FIELDS:
+        columns = [f"{field}_{suffix}" for suffix in PLATFORMS.values() if f"{field}_{suffix}" in df.columns]
+        if not columns:
+            continue
+
+        non_null = sum(int(df[col].notna().sum()) for col in columns)
+        categories = set()
+        for col in columns:
+            categories.update(df[col].dropna().unique())
+
+        if non_null == 0 or len(categories) > max_category_ratio * non_null:
+            continue
+
+        dtype = pd.CategoricalDtype(sorted(categories))
+        for col in columns:
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+def memory_report(df, raw_memory=None):
+    """
+    Per-column memory before and after compaction, in bytes. Before is each
+    chunk as read_csv returned it, so text is already Arrow-backed and only
+    the categorical and date conversions show up in the ratio.
+    """
+    raw_memory = raw_memory if raw_memory is not None else df.attrs.get('raw_memory', {})
+    after = df.memory_usage(deep=True, index=False)
+
+    report = pd.DataFrame({
+        'before': pd.Series(raw_memory, dtype='int64').reindex(after.index).fillna(0).astype('int64'),
+        'after': after.astype('int64'),
+        'dtype': df.dtypes.astype(str)
+    })
+    report.loc['Total'] = [report['before'].sum(), report['after'].sum(), '']
+    report['ratio'] = (report['before'] / report['after'].where(report['after'] > 0)).round(2)
+
+    return report
+
+def _numeric_block(df, field, suffixes):
+    """
+    Stack the per-platform columns of one field into (values, valid) arrays of
+    shape (rows, platforms), with missing values zeroed in values
+    """
+    columns = []
+    for suffix in suffixes:
+        col = f"{field}_{suffix}"
+        if col in df.columns:
+            columns.append(df[col].to_numpy(dtype='float64', na_value=np.nan))
+        else:
+            columns.append(np.full(len(df), np.nan))
+
+    values = np.column_stack(columns) if columns else np.empty((len(df), 0))
+    valid = ~np.isnan(values)
+    values[~valid] = 0
+
+    return values, valid
+
+def _date_block(df, field, suffixes):
+    """
+    Stack per-platform datetime columns as datetime64[ns]; unparsed columns are NaT
+    """
+    columns = []
+    for suffix in suffixes:
+        col = f"{field}_{suffix}"
+        if col in df.columns and pd.api.types.is_datetime64_any_dtype(df[col]):
+            columns.append(df[col].to_numpy(dtype='datetime64[ns]'))
+        else:
+            columns.append(np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]'))
+    return np.column_stack(columns) if columns else np.empty((len(df), 0), dtype='datetime64[ns]')
+
+def _summarize_block(ages, followers, following, mask=None):
+    """
+    Reduce the numeric block to KPI values, optionally restricted to mask.
+
+    Blocks are (values, valid) pairs with missing values already zeroed, so
+    masked sums need no temporary copies.
+    """
+    (age_values, age_valid), (follower_values, _), (following_values, _) = ages, followers, following
+
+    if mask is None:
+        users = None
+        age_count = np.count_nonzero(age_valid)
+        age_sum = age_values.sum()
+        total_followers = follower_values.sum()
+        total_following = following_values.sum()
+    else:
+        users = int(np.count_nonzero(mask.any(axis=1)))
+        age_count = np.count_nonzero(age_valid & mask)
+        age_sum = age_values.sum(where=mask)
+        total_followers = follower_values.sum(where=mask)
+        total_following = following_values.sum(where=mask)
+
+    return {
+        'users': users,
+        'avg_age': float(age_sum / age_count) if age_count else 0,
+        'total_followers': float(total_followers),
+        'engagement_rate': float(total_followers / total_following * 100) if total_following > 0 else 0
+    }
+
+def calculate_metrics(df, users_to_analyze, period_days=None, exact_distinct=False):
+    """
+    Calculate key metrics from the dataframe.
+
+    Deltas compare the last period_days before the latest login with the
+    period_days before that, counting a platform row in the period its
+    login falls in. Unique users come from the HyperLogLog sketch unless
+    exact_distinct is set.
+    """
+    period_days = period_days or METRICS_CONFIG["period_days"]
+    metrics = {}
+
+    try:
+        # Total users (unique emails)
+        metrics['total_users'] = count_distinct(df, 'email', exact_distinct) if 'email' in df.columns else len(df)
+
+        suffixes = [PLATFORMS[user] for user in users_to_analyze if user in PLATFORMS]
+        ages = _numeric_block(df, 'age', suffixes)
+        followers = _numeric_block(df, 'followers', suffixes)
+        following = _numeric_block(df, 'following', suffixes)
+
+        overall = _summarize_block(ages, followers, following)
+        metrics['avg_age'] = overall['avg_age']
+        metrics['total_followers'] = int(overall['total_followers'])
+        metrics['engagement_rate'] = overall['engagement_rate']
+
+        # Period-over-period deltas from login dates
+        logins = _date_block(df, 'date_of_login', suffixes)
+        has_login = ~np.isnat(logins)
+        if has_login.any():
+            period = np.timedelta64(period_days, 'D')
+            end = logins[has_login].max() + np.timedelta64(1, 'ns')
+            current_mask = has_login & (logins >= end - period)
+            previous_mask = has_login & (logins >= end - 2 * period) & (logins < end - period)
+
+            current = _summarize_block(ages, followers, following, current_mask)
+            previous = _summarize_block(ages, followers, following, previous_mask)
+
+            metrics['user_growth'] = current['users'] - previous['users']
+            metrics['age_trend'] = round(current['avg_age'] - previous['avg_age'], 1)
+            metrics['follower_growth'] = int(current['total_followers'] - previous['total_followers'])
+            metrics['engagement_delta'] = round(current['engagement_rate'] - previous['engagement_rate'], 2)
+        else:
+            metrics['user_growth'] = 0
+            metrics['age_trend'] = 0
+            metrics['follower_growth'] = 0
+            metrics['engagement_delta'] = 0
+
+    except Exception as e:
+        st.error(f"Error calculating metrics: {str(e)}")
+        # Return default metrics
+        metrics = {
+            'total_users': 0,
+            'avg_age': 0,
+            'total_followers': 0,
+            'engagement_rate': 0,
+            'user_growth': 0,
+            'age_trend': 0,
+            'follower_growth': 0,
+            'engagement_delta': 0
+        }
+
+    return metrics
+
+def build_long_table(df):
+    """
+    Reshape the wide x/y/z columns into one row per (email, platform)
+    """
+    frames = []
+
+    for platform, suffix in PLATFORMS.items():
+        rename = {f"{field}_{suffix}": name for field, name in PLATFORM_FIELDS.items() if f"{field}_{suffix}" in df.columns}
+        if not rename:
+            continue
+
+        part = df[list(rename)].rename(columns=rename)
+        # Platforms the user is not on are entirely empty for that block
+        present = part.notna().any(axis=1)
+        part = part[present]
+        part.insert(0, 'platform', platform)
+        part.insert(0, 'email', df['email'][present] if 'email' in df.columns else pd.NA)
+        frames.append(part)
+
+    columns = ['email', 'platform'] + list(PLATFORM_FIELDS.values())
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    long_df = pd.concat(frames, ignore_index=True).reindex(columns=columns)
+    long_df['platform'] = pd.Categorical(long_df['platform'], categories=list(PLATFORMS))
+
+    # Frames read straight from the columnar cache still hold dates as text
+    for col in ['login', 'logout']:
+        if not pd.api.types.is_datetime64_any_dtype(long_df[col]):
+            long_df[col], _ = parse_dates(long_df[col])
+
+    return long_df
+
+_FRAME_CACHE = {}
+
+def memoize_on_frame(df, name, builder):
+    """
+    Build a derived structure once per frame and keep it while df is alive.
+
+    Frames must not be mutated in place after their first use here.
+    """
+    key = (id(df), name)
+    cached = _FRAME_CACHE.get(key)
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+
+    value = builder(df)
+    _FRAME_CACHE[key] = (weakref.ref(df), value)
+    weakref.finalize(df, _FRAME_CACHE.pop, key, None)
+
+    return value
+
+def get_long_table(df):
+    """
+    Return the long-format table for df, building it once per frame
+    """
+    return memoize_on_frame(df, 'long_table', build_long_table)
+
+def get_aggregate_cube(df):
+    """
+    Return the aggregate cube for df, building it once per frame
+    """
+    return memoize_on_frame(df, 'aggregate_cube', lambda frame: build_aggregate_cube(get_long_table(frame)))
+
+def _frame_chunks(df, chunk_size=None):
+    chunk_size = chunk_size or LOADER_CONFIG["chunk_size"]
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+def get_top_k_sketches(df):
+    """
+    Return the location/interest heavy-hitter sketches for df, built once
+    per frame in loader-sized chunks
+    """
+    return memoize_on_frame(df, 'top_k_sketches', lambda frame: build_top_k_sketches(_frame_chunks(frame)))
+
+def get_distinct_sketches(df):
+    """
+    Return the per-column HyperLogLog counters for df, built once per frame
+    in loader-sized chunks
+    """
+    return memoize_on_frame(df, 'distinct_sketches', lambda frame: build_distinct_sketches(_frame_chunks(frame)))
+
+def count_distinct(df, column, exact=False):
+    """
+    Distinct non-missing values of column; from the HyperLogLog sketch
+    (itself exact for small columns) unless exact forces a full count
+    """
+    if column not in df.columns:
+        return 0
+    sketch = get_distinct_sketches(df).get(column)
+    # No sketch is built for a frame without rows
+    if sketch is None or (exact and not sketch.is_exact):
+        return int(df[column].nunique())
+    return sketch.count()
+
+def get_top_distribution(df, field, users_to_analyze, n=None):
+    """
+    Top-n values of field per selected user with the rest bucketed as
+    'Other', answered from the heavy-hitter sketches
+    """
+    n = n or SKETCH_CONFIG["top_n"]
+    sketches = get_top_k_sketches(df)[field]
+    return {user: sketches[user].top_with_other(n).to_dict() for user in users_to_analyze}
+
+def _select_platforms(long_df, users_to_analyze):
+    return long_df[long_df['platform'].isin(users_to_analyze)]
+
+def get_user_data_by_type(df, data_type, users_to_analyze):
+    """
+    Extract specific type of data for selected users
+    """
+    field = PLATFORM_FIELDS.get(data_type, data_type)
+    long_df = get_long_table(df)
+
+    if field not in long_df.columns:
+        return {user: [] for user in users_to_analyze}
+
+    values = _select_platforms(long_df, users_to_analyze)[['platform', field]].dropna()
+    grouped = {platform: group[field].tolist() for platform, group in values.groupby('platform', observed=True)}
+
+    return {user: grouped.get(user, []) for user in users_to_analyze}
+
+def get_numeric_by_type(df, data_type, users_to_analyze):
+    """
+    Numeric values of one field per selected user as float arrays, without
+    the round trip through Python lists
+    """
+    field = PLATFORM_FIELDS.get(data_type, data_type)
+    long_df = get_long_table(df)
+
+    if field not in long_df.columns:
+        return {user: np.empty(0) for user in users_to_analyze}
+
+    values = _select_platforms(long_df, users_to_analyze)
+    numbers = pd.to_numeric(values[field], errors='coerce').astype('float64')
+    valid = numbers.notna()
+    grouped = {
+        platform: group.to_numpy()
+        for platform, group in numbers[valid].groupby(values['platform'][valid], observed=True)
+    }
+
+    return {user: grouped.get(user, np.empty(0)) for user in users_to_analyze}
+
+def calculate_session_duration(df, users_to_analyze):
+    """
+    Calculate session duration for users
+    """
+    long_df = _select_platforms(get_long_table(df), users_to_analyze)
+    sessions = long_df[['platform', 'login', 'logout']].dropna()
+
+    grouped = {}
+    if len(sessions) > 0:
+        # Calculate session duration in hours
+        durations = (sessions['logout'] - sessions['login']).dt.total_seconds() / 3600
+        grouped = {platform: group.tolist() for platform, group in durations.groupby(sessions['platform'], observed=True)}
+
+    return {user: grouped.get(user, []) for user in users_to_analyze}
+
+def _session_durations(df, users_to_analyze):
+    """
+    Session durations in hours and their platforms as numpy arrays
+    """
+    sessions = _select_platforms(get_long_table(df), users_to_analyze)[['platform', 'login', 'logout']].dropna()
+    login = sessions['login'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    logout = sessions['logout'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    return (logout - login) / 3.6e12, sessions['platform'].astype(str).to_numpy()
+
+def summarize_session_durations(df, users_to_analyze, max_outliers=None, random_state=42):
+    """
+    Box plot statistics of session durations (hours) per user
+
+    Returns {user: {count, q1, median, q3, lowerfence, upperfence, outliers}}
+    for users with sessions. Whiskers follow the 1.5 IQR rule and outliers
+    are a random sample of at most max_outliers values that always keeps
+    the extremes, so the result size does not grow with the session count.
+    """
+    max_outliers = max_outliers or CHART_CONFIG["box_max_outliers"]
+    durations, platforms = _session_durations(df, users_to_analyze)
+    rng = np.random.default_rng(random_state)
+
+    stats = {}
+    for user in users_to_analyze:
+        values = durations[platforms == user]
+        if len(values) == 0:
+            continue
+
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        inside = (values >= low) & (values <= high)
+
+        outliers = values[~inside]
+        if len(outliers) > max_outliers:
+            # Sample the interior only, so the extremes are never drawn twice
+            extremes = [outliers.argmin(), outliers.argmax()]
+            interior = np.delete(outliers, extremes)
+            outliers = np.concatenate([outliers[extremes], rng.choice(interior, max_outliers - 2, replace=False)])
+
+        stats[user] = {
+            'count': len(values),
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': values[inside].min(),
+            'upperfence': values[inside].max(),
+            'outliers': outliers
+        }
+
+    return stats
+
+def _get_distribution(df, field, users_to_analyze):
+    counts = rollup(get_aggregate_cube(df), ['platform', field], where={'platform': users_to_analyze})['count']
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    distribution = {user: {} for user in users_to_analyze}
+    for (platform, value), count in counts.items():
+        if pd.notna(value):
+            distribution[platform][value] = int(count)
+
+    return distribution
+
+def get_location_distribution(df, users_to_analyze):
+    """
+    Get location distribution for selected users
+    """
+    return _get_distribution(df, 'location', users_to_analyze)
+
+def get_interest_distribution(df, users_to_analyze):
+    """
+    Get interest distribution for selected users
+    """
+    return _get_distribution(df, 'interest', users_to_analyze)
+
+def get_platform_summary(df, users_to_analyze):
+    """
+    Per-platform engagement figures rolled up from the aggregate cube
+    """
+    summary = rollup(get_aggregate_cube(df), ['platform'], where={'platform': users_to_analyze})
+    summary = summary.rename(columns={'count': 'rows'})[['rows', 'avg_age', 'followers', 'following']]
+
+    summary = summary.reindex(users_to_analyze)
+    summary['rows'] = summary['rows'].fillna(0).astype('int64')
+    summary[['followers', 'following']] = summary[['followers', 'following']].fillna(0)
+
+    return summary
@@ -0,0 +1,106 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Candidate formats, most specific first
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d',
+    '%d-%m-%Y',
+    '%m-%d-%Y'
+]
+
+_MANGLED_SUFFIX = re.compile(r'^(?P<base>.+)\.\d+$')
+_PLATFORM_SUFFIX = re.compile(r'^(?P<field>.+)_(?P<suffix>[a-z])$')
+
+
+def detect_date_format(values, sample_size=1000, formats=DATE_FORMATS):
+    """
+    Pick the format that parses the largest share of a sample of values
+    """
+    sample = pd.Series(values).dropna()
+    sample = sample[sample.astype(str).str.strip() != '']
+    if sample.empty:
+        return None
+
+    sample = pd.Series(sample.unique()[:sample_size]).astype(str)
+
+    best_format, best_parsed = None, 0
+    for fmt in formats:
+        parsed = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if parsed > best_parsed:
+            best_format, best_parsed = fmt, parsed
+            if parsed == len(sample):
+                break
+
+    return best_format
+
+
+def parse_dates(series, fmt=None):
+    """
+    Parse a date column once per distinct value.
+
+    Returns (parsed, info) where info holds the format used and how many
+    non-empty values were coerced to NaT. Values the detected format cannot
+    read fall back to pandas' mixed-format parser, applied only to those
+    distinct values.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series, {'format': None, 'coerced': 0}
+
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+    blank = (uniques.str.strip() == '').to_numpy()
+
+    fmt = fmt or detect_date_format(uniques[~blank])
+    if fmt is not None:
+        parsed_uniques = pd.to_datetime(uniques, format=fmt, errors='coerce')
+    else:
+        parsed_uniques = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+
+    leftover = parsed_uniques.isna().to_numpy() & ~blank
+    if leftover.any():
+        parsed_uniques[leftover] = pd.to_datetime(uniques[leftover], format='mixed', errors='coerce')
+
+    # Missing values have code -1, which picks the trailing NaT
+    lookup = np.append(parsed_uniques.to_numpy(), np.array(['NaT'], dtype=parsed_uniques.dtype))
+    parsed = pd.Series(lookup[codes], index=series.index, name=series.name)
+
+    failed = parsed_uniques.isna().to_numpy() & ~blank
+    coerced = int(np.isin(codes, np.flatnonzero(failed)).sum())
+
+    return parsed, {'format': fmt, 'coerced': coerced}
+
+
+def fix_duplicate_date_headers(columns):
+    """
+    Rename mangled duplicate headers (e.g. the second date_of_login_x, read as
+    date_of_login_x.1) after the platform block they sit in
+    """
+    columns = list(columns)
+    fixed = list(columns)
+
+    for i, col in enumerate(columns):
+        mangled = _MANGLED_SUFFIX.match(col)
+        if not mangled or i == 0:
+            continue
+
+        field = _PLATFORM_SUFFIX.match(mangled.group('base'))
+        neighbour = _PLATFORM_SUFFIX.match(columns[i - 1])
+        if not field or not neighbour:
+            continue
+
+        renamed = f"{field.group('field')}_{neighbour.group('suffix')}"
+        if renamed not in fixed:
+            fixed[i] = renamed
+
+    return fixed
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import shap
+from joblib import Parallel, delayed
+
+from config import SHAP_CONFIG
+from utils.cache import get_dataset_cache
+
+
+def _positive_class(values):
+    # Classifiers return one matrix per class, as a list or a trailing axis
+    if isinstance(values, list):
+        return np.asarray(values[-1])
+    values = np.asarray(values)
+    return values[:, :, -1] if values.ndim == 3 else values
+
+
+def _explain_chunk(explainer, features):
+    return _positive_class(explainer.shap_values(features, check_additivity=False))
+
+
+def explain_frame(pipeline, df, background_size=None, max_rows=None, chunk_size=None, n_jobs=None, random_state=42):
+    """
+    SHAP values of the positive class for the rows of df
+
+    The tree model is explained interventionally against a small random
+    background, over chunks of rows spread across n_jobs workers. Returns
+    a dict with the explained features, values, expected_value, background
+    size and timing.
+    """
+    background_size = background_size or SHAP_CONFIG["background_size"]
+    max_rows = max_rows or SHAP_CONFIG["max_rows"]
+    chunk_size = chunk_size or SHAP_CONFIG["chunk_size"]
+    n_jobs = n_jobs or SHAP_CONFIG["n_jobs"]
+    start = time.perf_counter()
+
+    features = pipeline[:-1].transform(df)
+    if len(features) > max_rows:
+        features = features.sample(max_rows, random_state=random_state)
+    background = features.sample(min(background_size, len(features)), random_state=random_state)
+
+    model = pipeline[-1]
+    if hasattr(model, 'to_shap_model'):
+        model = model.to_shap_model()
+    explainer = shap.TreeExplainer(model, data=background, feature_perturbation='interventional')
+    chunks = [features.iloc[i:i + chunk_size] for i in range(0, len(features), chunk_size)]
+    values = Parallel(n_jobs=n_jobs)(delayed(_explain_chunk)(explainer, chunk) for chunk in chunks)
+
+    return {
+        'features': features,
+        'values': np.vstack(values) if values else np.empty((0, features.shape[1])),
+        'expected_value': float(np.atleast_1d(explainer.expected_value)[-1]),
+        'background_size': len(background),
+        'seconds': time.perf_counter() - start
+    }
+
+
+def get_shap_values(model_hash, dataset_hash, pipeline, df):
+    """
+    Return the SHAP explanation of a dataset, computed once per
+    (model, dataset) pair
+    """
+    cache = get_dataset_cache()
+    key = (dataset_hash, 'shap', model_hash)
+
+    cached = cache.get(key)
+    if cached is None:
+        cached = cache.put(key, explain_frame(pipeline, df))
+
+    return cached
@@ -0,0 +1,154 @@
+import gzip
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from config import DATA_VALIDATION, EXPORT_CONFIG
+from utils.dates import parse_dates
+
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Formats that are not already compressed and can be gzipped on the way out
+GZIP_FORMATS = {'csv', 'jsonl'}
+
+XLSX_MAX_ROWS = 1_048_575
+
+
+def iter_chunks(df, rows=None, chunk_size=None):
+    """
+    Yield df (or the given positional rows of it) one chunk at a time
+    """
+    chunk_size = chunk_size or EXPORT_CONFIG["chunk_size"]
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    for start in range(0, len(rows), chunk_size):
+        yield _parse_date_columns(df.iloc[rows[start:start + chunk_size]])
+
+
+def _parse_date_columns(chunk):
+    """
+    Parse date columns still held as text, so every format writes them with
+    datetime_format (or as Parquet timestamps)
+    """
+    text_dates = [
+        col for col in DATA_VALIDATION["date_columns"]
+        if col in chunk.columns and not pd.api.types.is_datetime64_any_dtype(chunk[col])
+    ]
+    if not text_dates:
+        return chunk
+    chunk = chunk.copy()
+    for col in text_dates:
+        chunk[col], _ = parse_dates(chunk[col])
+    return chunk
+
+
+def _format_dates(chunk, datetime_format):
+    """
+    Render datetime columns with the configured format
+    """
+    date_columns = [col for col in chunk.columns if pd.api.types.is_datetime64_any_dtype(chunk[col])]
+    if not date_columns:
+        return chunk
+    chunk = chunk.copy()
+    for col in date_columns:
+        chunk[col] = chunk[col].dt.strftime(datetime_format)
+    return chunk
+
+
+def _write_csv(chunks, fileobj, datetime_format):
+    for i, chunk in enumerate(chunks):
+        fileobj.write(chunk.to_csv(index=False, header=(i == 0), date_format=datetime_format).encode('utf-8'))
+
+
+def _write_jsonl(chunks, fileobj, datetime_format):
+    for chunk in chunks:
+        text = _format_dates(chunk, datetime_format).to_json(orient='records', lines=True, force_ascii=False)
+        if text and not text.endswith('\n'):
+            text += '\n'
+        fileobj.write(text.encode('utf-8'))
+
+
+def _write_xlsx(chunks, fileobj, datetime_format):
+    # Write-only workbooks stream rows to disk instead of building a cell tree
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("data")
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            sheet.append([str(col) for col in chunk.columns])
+        chunk = _format_dates(chunk, datetime_format).astype(object)
+        for row in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(fileobj)
+
+
+def _write_parquet(chunks, fileobj, datetime_format):
+    # Timestamps stay typed in Parquet; datetime_format only applies to text formats
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            # Columns that are entirely empty in the first chunk are typed as strings
+            schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ], metadata=table.schema.metadata)
+            writer = pq.ParquetWriter(fileobj, schema)
+        writer.write_table(table.cast(writer.schema))
+    if writer is not None:
+        writer.close()
+
+
+WRITERS = {
+    'csv': _write_csv,
+    'jsonl': _write_jsonl,
+    'xlsx': _write_xlsx,
+    'parquet': _write_parquet
+}
+
+
+def write_export(df, fmt, fileobj, rows=None, compress=False, chunk_size=None, datetime_format=None):
+    """
+    Stream df (or the given rows) into fileobj in the requested format
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == 'xlsx' and (len(df) if rows is None else len(rows)) > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX exports are limited to {XLSX_MAX_ROWS:,} rows")
+
+    datetime_format = datetime_format or EXPORT_CONFIG["datetime_format"]
+    chunks = iter_chunks(df, rows, chunk_size)
+
+    if compress and fmt in GZIP_FORMATS:
+        with gzip.GzipFile(fileobj=fileobj, mode='wb') as gz:
+            WRITERS[fmt](chunks, gz, datetime_format)
+    else:
+        WRITERS[fmt](chunks, fileobj, datetime_format)
+
+    return fileobj
+
+
+def export_file(df, fmt, rows=None, compress=False, chunk_size=None):
+    """
+    Export to a spooled temporary file that moves to disk past
+    EXPORT_CONFIG["spool_max_bytes"], rewound and ready to read
+    """
+    fileobj = tempfile.SpooledTemporaryFile(max_size=EXPORT_CONFIG["spool_max_bytes"])
+    write_export(df, fmt, fileobj, rows=rows, compress=compress, chunk_size=chunk_size)
+    fileobj.seek(0)
+    return fileobj
+
+
+def export_file_name(base_name, fmt, compress=False):
+    return f"{base_name}.{fmt}" + (".gz" if compress and fmt in GZIP_FORMATS else "")
+
+
+def export_mime_type(fmt, compress=False):
+    return 'application/gzip' if compress and fmt in GZIP_FORMATS else MIME_TYPES[fmt]
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+from config import PLATFORMS
+from utils.dates import parse_dates
+
+IDENTIFIER_COLUMNS = ['email'] + [f"username_{suffix}" for suffix in PLATFORMS.values()]
+TEXT_COLUMNS = [f"{field}_{suffix}" for field in ['location', 'interest'] for suffix in PLATFORMS.values()]
+DATE_COLUMNS = [f"{field}_{suffix}" for field in ['date_of_login', 'date_of_logout'] for suffix in PLATFORMS.values()]
+ENCODED_COLUMNS = ['location_x']
+ENCODED_SUFFIX = '_encoded'
+
+# Missing dates reached the model as NaT cast to int64 and floor-divided to seconds
+NAT_SECONDS = np.iinfo(np.int64).min // 10**9
+
+
+def epoch_seconds(values):
+    """
+    Dates as integer seconds since the epoch, missing dates as NAT_SECONDS
+    """
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values, _ = parse_dates(values)
+    stamps = values.to_numpy(dtype='datetime64[s]')
+    return np.where(np.isnat(stamps), NAT_SECONDS, stamps.astype(np.int64))
+
+
+def encode_labels(values, encoder):
+    """
+    LabelEncoder codes for values without a per-row lookup
+
+    Unseen values get the code of the encoder's missing-value class when it
+    has one, otherwise -1.
+    """
+    classes = list(encoder.classes_)
+    known = [value for value in classes if not pd.isna(value)]
+    missing_code = len(known) if len(known) < len(classes) else -1
+
+    codes = pd.Categorical(values.astype(object), categories=known).codes.astype(np.int64)
+    codes[codes < 0] = missing_code
+    return codes
+
+
+def _source_column(name):
+    return name[:-len(ENCODED_SUFFIX)] if name.endswith(ENCODED_SUFFIX) else name
+
+
+def build_features(df, encoders, feature_names):
+    """
+    Model inputs for df in the order of feature_names: dates become epoch
+    seconds, <column>_encoded is the column label-encoded with
+    encoders[column] and everything else is read as a number
+    """
+    missing = [name for name in feature_names if _source_column(name) not in df.columns]
+    if missing:
+        raise ValueError(f"Missing model input columns: {missing}")
+
+    features = {}
+    for name in feature_names:
+        if name.endswith(ENCODED_SUFFIX):
+            features[name] = encode_labels(df[_source_column(name)], encoders[_source_column(name)])
+        elif name in DATE_COLUMNS:
+            features[name] = epoch_seconds(df[name])
+        else:
+            features[name] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype='float64')
+
+    return pd.DataFrame(features, index=df.index)
+
+
+class FeatureTransformer(TransformerMixin, BaseEstimator):
+    """
+    Raw dashboard rows to model inputs, shared by training and serving.
+
+    fit() label-encodes encoded_columns and keeps every other column that
+    is not an identifier, free text or the target; transform() applies
+    build_features with what was learned.
+    """
+
+    def __init__(self, encoded_columns=None, target='target'):
+        self.encoded_columns = encoded_columns
+        self.target = target
+
+    def fit(self, X, y=None):
+        encoded_columns = ENCODED_COLUMNS if self.encoded_columns is None else self.encoded_columns
+        excluded = set(IDENTIFIER_COLUMNS + TEXT_COLUMNS + [self.target])
+
+        self.encoders_ = {col: LabelEncoder().fit(X[col].astype(object)) for col in encoded_columns}
+        self.feature_names_out_ = (
+            [col for col in X.columns if col not in excluded]
+            + [f"{col}{ENCODED_SUFFIX}" for col in encoded_columns]
+        )
+        return self
+
+    def transform(self, X):
+        return build_features(X, self.encoders_, self.feature_names_out_)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_out_, dtype=object)
+
+    @classmethod
+    def from_encoders(cls, encoders, feature_names):
+        """
+        A fitted transformer for a model trained before the pipeline existed
+        """
+        transformer = cls(encoded_columns=list(encoders))
+        transformer.encoders_ = dict(encoders)
+        transformer.feature_names_out_ = list(feature_names)
+        return transformer
+
+
+def build_pipeline(model):
+    """
+    Unfitted feature + model pipeline, persisted as one artifact
+    """
+    return Pipeline([('features', FeatureTransformer()), ('model', model)])
+
+
+def pipeline_from_legacy(model, encoder):
+    """
+    Wrap a bare model and its location_x LabelEncoder in the same pipeline
+    """
+    features = FeatureTransformer.from_encoders({'location_x': encoder}, list(model.feature_names_in_))
+    return Pipeline([('features', features), ('model', model)])
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+from config import FILTER_CONFIG, PLATFORMS
+from utils.aggregates import age_buckets
+from utils.dates import parse_dates
+
+DATE_FIELDS = {'login': 'date_of_login', 'logout': 'date_of_logout'}
+FILTER_DIMENSIONS = ['platform', 'location', 'interest', 'age_bucket']
+
+
+class DateIndex:
+    """
+    Sorted login/logout timestamps per platform with their row ids.
+
+    A date range is answered by two binary searches per (platform, field)
+    and a gather of the row ids in between.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.sorted_values = {}
+        self.row_ids = {}
+
+        for platform, suffix in PLATFORMS.items():
+            for field, prefix in DATE_FIELDS.items():
+                col = f"{prefix}_{suffix}"
+                if col not in df.columns:
+                    continue
+
+                values, _ = parse_dates(df[col])
+                stamps = values.to_numpy(dtype='datetime64[ns]')
+                valid = np.flatnonzero(~np.isnat(stamps))
+                order = valid[np.argsort(stamps[valid], kind='stable')]
+
+                self.sorted_values[(platform, field)] = stamps[order]
+                self.row_ids[(platform, field)] = order
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.sorted_values.values()) + sum(rows.nbytes for rows in self.row_ids.values())
+
+    def bounds(self):
+        """
+        Earliest and latest indexed timestamp, or (None, None)
+        """
+        firsts = [values[0] for values in self.sorted_values.values() if len(values)]
+        lasts = [values[-1] for values in self.sorted_values.values() if len(values)]
+        if not firsts:
+            return None, None
+        return pd.Timestamp(min(firsts)), pd.Timestamp(max(lasts))
+
+    def rows_between(self, start, end, platforms=None, fields=None):
+        """
+        Sorted positional rows with a login or logout in [start, end] on any
+        of the platforms
+        """
+        start = np.datetime64(pd.Timestamp(start), 'ns')
+        end = np.datetime64(pd.Timestamp(end), 'ns')
+        platforms = platforms or list(PLATFORMS)
+        fields = fields or list(DATE_FIELDS)
+
+        selected = np.zeros(self.n_rows, dtype=bool)
+        for key, values in self.sorted_values.items():
+            if key[0] not in platforms or key[1] not in fields:
+                continue
+            lo = np.searchsorted(values, start, side='left')
+            hi = np.searchsorted(values, end, side='right')
+            selected[self.row_ids[key][lo:hi]] = True
+
+        return np.flatnonzero(selected)
+
+
+def pack_rows(rows, n_rows):
+    """
+    Packed bitmap with the bits of the given positional rows set
+    """
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+
+def unpack_rows(bitmap, n_rows):
+    """
+    Sorted positional rows whose bits are set in a packed bitmap
+    """
+    return np.flatnonzero(np.unpackbits(bitmap, count=n_rows))
+
+
+class BitmapIndex:
+    """
+    One packed bitmap per value of platform presence, location, interest
+    and age bucket.
+
+    A row matches a location, interest or age bucket if any of its
+    platforms does. Predicates resolve with bitwise ops on the packed
+    bitmaps, so the raw columns are never rescanned.
+    """
+
+    def __init__(self, df, max_values=None):
+        self.n_rows = len(df)
+        self.max_values = max_values or FILTER_CONFIG["max_values"]
+        self.bitmaps = {dim: {} for dim in FILTER_DIMENSIONS}
+
+        for platform, suffix in PLATFORMS.items():
+            username_col = f"username_{suffix}"
+            if username_col in df.columns:
+                self.bitmaps['platform'][platform] = np.packbits(df[username_col].notna().to_numpy())
+
+        for dim in ['location', 'interest', 'age_bucket']:
+            self._index_dimension(dim, df)
+
+    def _platform_values(self, dim, df):
+        field = 'age' if dim == 'age_bucket' else dim
+        for suffix in PLATFORMS.values():
+            col = f"{field}_{suffix}"
+            if col in df.columns:
+                yield age_buckets(df[col]) if dim == 'age_bucket' else df[col]
+
+    def _index_dimension(self, dim, df):
+        rows_by_value = {}
+        for values in self._platform_values(dim, df):
+            codes, uniques = pd.factorize(values, sort=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            for value_id, value in enumerate(uniques):
+                rows_by_value.setdefault(value, []).append(order[bounds[value_id]:bounds[value_id + 1]])
+
+        rows_by_value = {value: np.concatenate(parts) for value, parts in rows_by_value.items()}
+        kept = sorted(rows_by_value, key=lambda value: len(rows_by_value[value]), reverse=True)[:self.max_values]
+
+        # Age buckets keep their natural order, other values are listed alphabetically
+        order = sorted(kept, key=str) if dim != 'age_bucket' else [
+            value for value in age_buckets(pd.Series(dtype='float64')).cat.categories if value in kept
+        ]
+        for value in order:
+            self.bitmaps[dim][value] = pack_rows(rows_by_value[value], self.n_rows)
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for bitmaps in self.bitmaps.values() for bitmap in bitmaps.values())
+
+    def values(self, dim):
+        """
+        Indexed values of a dimension, for populating the filter widgets
+        """
+        return list(self.bitmaps[dim])
+
+    def all_rows(self):
+        return pack_rows(slice(None), self.n_rows)
+
+    def select(self, predicates, mode='and'):
+        """
+        Packed bitmap of rows matching predicates ({dimension: [values]})
+
+        Values within a dimension are OR'ed; dimensions are combined with
+        mode ('and' or 'or'). Empty predicates select every row.
+        """
+        selections = []
+        for dim, values in predicates.items():
+            if not values:
+                continue
+            selected = np.zeros_like(self.all_rows())
+            for value in values:
+                bitmap = self.bitmaps[dim].get(value)
+                if bitmap is not None:
+                    selected |= bitmap
+            selections.append(selected)
+
+        if not selections:
+            return self.all_rows()
+
+        combine = np.bitwise_and if mode == 'and' else np.bitwise_or
+        return combine.reduce(selections)
+
+    def rows(self, predicates, mode='and'):
+        """
+        Sorted positional rows matching predicates
+        """
+        return unpack_rows(self.select(predicates, mode), self.n_rows)
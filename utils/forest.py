@@ -0,0 +1,268 @@
+import hashlib
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from utils.features import FeatureTransformer
+
+MAGIC = b'RFNODES\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREDICT_BATCH_ROWS = 10_000
+
+# Node arrays of every tree back to back; child indices point into the combined arrays
+NODE_ARRAYS = {
+    'feature': np.int32,
+    'threshold': np.float64,
+    'left': np.int32,
+    'right': np.int32,
+    'missing_left': np.bool_,
+    'value': np.float64,
+    'weight': np.float64,
+    'tree_offsets': np.int64
+}
+
+
+class _LabelClasses:
+    """
+    Stand-in for a fitted LabelEncoder: encode_labels only needs classes_
+    """
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes, dtype=object)
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _node_arrays(model):
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.concatenate([[0], np.cumsum([tree.node_count for tree in trees])]).astype(np.int64)
+
+    def children(tree, offset, side):
+        return np.where(side == -1, -1, side + offset)
+
+    values = np.concatenate([tree.value[:, 0, :] for tree in trees])
+    return {
+        'feature': np.concatenate([tree.feature for tree in trees]),
+        'threshold': np.concatenate([tree.threshold for tree in trees]),
+        'left': np.concatenate([children(tree, offset, tree.children_left) for tree, offset in zip(trees, offsets)]),
+        'right': np.concatenate([children(tree, offset, tree.children_right) for tree, offset in zip(trees, offsets)]),
+        'missing_left': np.concatenate([
+            getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)) for tree in trees
+        ]),
+        # Class fractions per node, as RandomForestClassifier averages them
+        'value': values / values.sum(axis=1, keepdims=True),
+        'weight': np.concatenate([tree.weighted_n_node_samples for tree in trees]),
+        'tree_offsets': offsets
+    }
+
+
+def export_forest(pipeline, path):
+    """
+    Write a fitted feature + RandomForestClassifier pipeline as flat node
+    arrays behind a JSON header; returns the payload hash
+    """
+    features, model = pipeline[:-1][-1], pipeline[-1]
+    arrays = {name: np.ascontiguousarray(values, dtype=NODE_ARRAYS[name]) for name, values in _node_arrays(model).items()}
+
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        offset = _align(offset)
+        layout[name] = {'dtype': np.dtype(values.dtype).str, 'shape': list(values.shape), 'offset': offset}
+        offset += values.nbytes
+
+    digest = hashlib.sha256()
+    for values in arrays.values():
+        digest.update(values.tobytes())
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'sha256': digest.hexdigest(),
+        'classes': model.classes_.tolist(),
+        'feature_names': list(features.feature_names_out_),
+        'encoders': {
+            col: [None if pd.isna(value) else value for value in encoder.classes_]
+            for col, encoder in features.encoders_.items()
+        },
+        'arrays': layout
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    payload_start = _align(len(MAGIC) + 4 + len(header_bytes))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+        for name, values in arrays.items():
+            f.seek(payload_start + layout[name]['offset'])
+            f.write(values.tobytes())
+
+    return header['sha256']
+
+
+def read_header(path):
+    """
+    Return (header, payload_start) of a node-array artifact
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a node-array model artifact")
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length))
+
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact version {header['format_version']} (expected {FORMAT_VERSION})")
+    return header, _align(len(MAGIC) + 4 + length)
+
+
+class ForestPredictor:
+    """
+    RandomForestClassifier predictions straight from memory-mapped node
+    arrays.
+
+    The arrays are read-only views of the artifact file, so every process
+    that loads it shares the same page cache instead of its own copy. This
+    is a plain predictor, not an sklearn estimator: it cannot be refitted.
+    """
+
+    def __init__(self, arrays, classes_, feature_names_in_):
+        self.arrays = arrays
+        self.classes_ = classes_
+        self.feature_names_in_ = feature_names_in_
+
+    @classmethod
+    def from_arrays(cls, arrays, classes, feature_names):
+        """
+        A predictor over node arrays with the classes and feature names
+        stored in the artifact header
+        """
+        return cls(arrays, np.asarray(classes), np.asarray(feature_names, dtype=object))
+
+    @property
+    def n_estimators(self):
+        return len(self.arrays['tree_offsets']) - 1
+
+    @property
+    def n_features_in_(self):
+        return len(self.feature_names_in_)
+
+    def _leaves(self, X):
+        arrays = self.arrays
+        n_trees = self.n_estimators
+        nodes = np.tile(np.asarray(arrays['tree_offsets'][:-1]), len(X))
+        rows = np.repeat(np.arange(len(X)), n_trees)
+        active = np.arange(len(nodes))
+
+        # Advance the (row, tree) pairs still on a split one level per step
+        while len(active):
+            current = nodes[active]
+            feature = arrays['feature'][current]
+            internal = feature >= 0
+            active, current, feature = active[internal], current[internal], feature[internal]
+
+            x = X[rows[active], feature]
+            go_left = np.where(np.isnan(x), arrays['missing_left'][current], x <= arrays['threshold'][current])
+            nodes[active] = np.where(go_left, arrays['left'][current], arrays['right'][current])
+
+        return nodes.reshape(len(X), n_trees)
+
+    def predict_proba(self, X):
+        # Trees compare float32 inputs, as sklearn does
+        X = np.asarray(X[list(self.feature_names_in_)] if isinstance(X, pd.DataFrame) else X, dtype=np.float32)
+        probabilities = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_BATCH_ROWS):
+            leaves = self._leaves(X[start:start + PREDICT_BATCH_ROWS])
+            probabilities[start:start + PREDICT_BATCH_ROWS] = self.arrays['value'][leaves].mean(axis=1)
+        return probabilities
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def to_shap_model(self):
+        """
+        The forest in shap.TreeExplainer's dictionary model format
+        """
+        arrays = self.arrays
+        offsets = arrays['tree_offsets']
+        trees = []
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            left = np.where(arrays['left'][start:end] == -1, -1, arrays['left'][start:end] - start)
+            right = np.where(arrays['right'][start:end] == -1, -1, arrays['right'][start:end] - start)
+            trees.append({
+                'children_left': left,
+                'children_right': right,
+                'children_default': np.where(arrays['missing_left'][start:end], left, right),
+                'features': np.array(arrays['feature'][start:end]),
+                'thresholds': np.array(arrays['threshold'][start:end]),
+                'values': arrays['value'][start:end] / (len(offsets) - 1),
+                # shap rewrites the weights in place, so it gets its own copy
+                'node_sample_weight': np.array(arrays['weight'][start:end])
+            })
+        return {
+            'trees': trees,
+            'input_dtype': np.float32,
+            'internal_dtype': np.float64,
+            'tree_output': 'probability'
+        }
+
+
+class ForestPipeline:
+    """
+    The feature transformer and a ForestPredictor, answering the parts of
+    the sklearn Pipeline interface the dashboard uses: predict_proba,
+    predict, classes_ and step indexing (pipeline[:-1], pipeline[-1])
+    """
+
+    def __init__(self, features, model):
+        self.features = features
+        self.model = model
+
+    @property
+    def steps(self):
+        return [('features', self.features), ('model', self.model)]
+
+    @property
+    def classes_(self):
+        return self.model.classes_
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Pipeline(self.steps[index])
+        return self.steps[index][1]
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(self.features.transform(X))
+
+    def predict(self, X):
+        return self.model.predict(self.features.transform(X))
+
+
+def load_forest(path, verify=True):
+    """
+    Rebuild the feature + model pipeline from a node-array artifact without
+    unpickling; returns (pipeline, payload hash)
+    """
+    header, payload_start = read_header(path)
+
+    arrays = {
+        name: np.memmap(path, mode='r', dtype=np.dtype(spec['dtype']), offset=payload_start + spec['offset'], shape=tuple(spec['shape']))
+        for name, spec in header['arrays'].items()
+    }
+    if verify:
+        digest = hashlib.sha256()
+        for name in header['arrays']:
+            digest.update(memoryview(arrays[name]).cast('B'))
+        if digest.hexdigest() != header['sha256']:
+            raise ValueError(f"{path} is corrupt: payload hash does not match its header")
+
+    encoders = {
+        col: _LabelClasses([np.nan if value is None else value for value in classes])
+        for col, classes in header['encoders'].items()
+    }
+    features = FeatureTransformer.from_encoders(encoders, header['feature_names'])
+    predictor = ForestPredictor.from_arrays(arrays, header['classes'], header['feature_names'])
+
+    return ForestPipeline(features, predictor), header['sha256']
@@ -0,0 +1,54 @@
+import numpy as np
+
+from config import DATA_VALIDATION
+from utils.data_processing import memoize_on_frame
+from utils.dates import parse_dates
+
+
+def _build_sort_permutation(df, column, ascending):
+    values = df[column].reset_index(drop=True)
+    if column in DATA_VALIDATION["date_columns"]:
+        # Dates still held as text would otherwise sort lexicographically
+        values, _ = parse_dates(values)
+    return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+def get_sort_permutation(df, column, ascending=True):
+    """
+    Positional row order for df sorted by column, computed once per frame
+    """
+    return memoize_on_frame(df, ('sort', column, ascending), lambda frame: _build_sort_permutation(frame, column, ascending))
+
+
+def _build_sort_rank(df, column, ascending):
+    permutation = get_sort_permutation(df, column, ascending)
+    rank = np.empty(len(permutation), dtype=np.int64)
+    rank[permutation] = np.arange(len(permutation))
+    return rank
+
+
+def order_rows(df, rows=None, sort_column=None, ascending=True):
+    """
+    Positional row ids to display, optionally restricted to rows and sorted
+    by sort_column using the cached permutation
+    """
+    if sort_column is None:
+        return np.arange(len(df)) if rows is None else np.asarray(rows)
+
+    if rows is None:
+        return get_sort_permutation(df, sort_column, ascending)
+
+    rank = memoize_on_frame(df, ('rank', sort_column, ascending), lambda frame: _build_sort_rank(frame, sort_column, ascending))
+    rows = np.asarray(rows)
+    return rows[np.argsort(rank[rows], kind='stable')]
+
+
+def get_page(df, rows, page, page_size):
+    """
+    Slice one page of df for the given ordered row ids; returns (page_df, n_pages)
+    """
+    n_pages = max(1, -(-len(rows) // page_size))
+    page = min(max(page, 1), n_pages)
+    start = (page - 1) * page_size
+
+    return df.iloc[rows[start:start + page_size]], n_pages
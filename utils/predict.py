@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import PREDICT_CONFIG
+from utils.cache import get_dataset_cache
+
+
+def predict_in_batches(pipeline, df, batch_size=None):
+    """
+    predict_proba over raw rows one batch at a time, so features are only
+    ever materialized for one batch
+    """
+    batch_size = batch_size or PREDICT_CONFIG["batch_size"]
+    probabilities = np.empty((len(df), len(pipeline.classes_)), dtype='float64')
+    for start in range(0, len(df), batch_size):
+        probabilities[start:start + batch_size] = pipeline.predict_proba(df.iloc[start:start + batch_size])
+    return probabilities
+
+
+def score_frame(pipeline, df, batch_size=None):
+    """
+    Score df with the feature + model pipeline; returns (scores, stats)
+    where scores holds the predicted class and positive-class probability
+    per row of df
+    """
+    start = time.perf_counter()
+
+    probabilities = predict_in_batches(pipeline, df, batch_size)
+    scores = pd.DataFrame({
+        'prediction': pipeline.classes_[probabilities.argmax(axis=1)],
+        'probability': probabilities[:, -1]
+    }, index=df.index)
+
+    seconds = time.perf_counter() - start
+    stats = {'rows': len(df), 'seconds': seconds, 'rows_per_sec': len(df) / seconds if seconds > 0 else float('inf')}
+
+    return scores, stats
+
+
+def get_predictions(model_hash, dataset_hash, pipeline, df):
+    """
+    Return (scores, stats) for a dataset, scoring it only once per
+    (model, dataset) pair
+    """
+    cache = get_dataset_cache()
+    key = (dataset_hash, 'predictions', model_hash)
+
+    cached = cache.get(key)
+    if cached is None:
+        cached = cache.put(key, score_frame(pipeline, df))
+
+    return cached
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from config import PLATFORMS, SAMPLING_CONFIG
+
+_PRIORITY = '_priority'
+_STRATUM = '_stratum'
+
+
+def assign_strata(chunk):
+    """
+    Label rows by platform presence and location, e.g. 'XY-|Delhi'
+
+    The location is the first non-empty location_* in platform order.
+    """
+    presence = pd.Series('', index=chunk.index)
+    location = pd.Series(np.nan, index=chunk.index, dtype=object)
+
+    for platform, suffix in PLATFORMS.items():
+        username_col = f"username_{suffix}"
+        has_platform = chunk[username_col].notna() if username_col in chunk.columns else pd.Series(False, index=chunk.index)
+        presence = presence + np.where(has_platform, platform.split()[-1], '-')
+
+        location_col = f"location_{suffix}"
+        if location_col in chunk.columns:
+            location = location.fillna(chunk[location_col].astype(object))
+
+    return presence + '|' + location.fillna('Unknown').astype(str)
+
+
+class StratifiedReservoir:
+    """
+    Streaming stratified sample with a per-stratum floor.
+
+    Every row gets a random priority. The sampler keeps the sample_size
+    lowest priorities overall (a plain reservoir) plus the min_per_stratum
+    lowest priorities of each stratum, so minority strata survive. Both are
+    bottom-k sketches, so a chunk only ever touches the rows kept so far.
+    """
+
+    def __init__(self, sample_size=None, min_per_stratum=None, random_state=42):
+        self.sample_size = sample_size or SAMPLING_CONFIG["sample_size"]
+        self.min_per_stratum = SAMPLING_CONFIG["min_per_stratum"] if min_per_stratum is None else min_per_stratum
+        self.rng = np.random.default_rng(random_state)
+        self.population = pd.Series(dtype='int64')
+        self.rows_seen = 0
+        self._overall = None
+        self._floors = None
+
+    def update(self, chunk):
+        chunk = chunk.copy()
+        chunk[_PRIORITY] = self.rng.random(len(chunk))
+        chunk[_STRATUM] = assign_strata(chunk).to_numpy()
+        self.rows_seen += len(chunk)
+
+        self.population = self.population.add(chunk[_STRATUM].value_counts(), fill_value=0).astype('int64')
+
+        overall = chunk if self._overall is None else pd.concat([self._overall, chunk])
+        self._overall = overall.nsmallest(self.sample_size, _PRIORITY)
+
+        if self.min_per_stratum > 0:
+            floors = chunk if self._floors is None else pd.concat([self._floors, chunk])
+            floors = floors.sort_values(_PRIORITY, kind='stable')
+            self._floors = floors[floors.groupby(_STRATUM, sort=False).cumcount() < self.min_per_stratum]
+
+        return self
+
+    def result(self):
+        """
+        Return (sample_df, report) with a sample_weight column for reweighting
+        """
+        if self._overall is None:
+            return pd.DataFrame(), pd.DataFrame(columns=['population', 'sampled', 'weight'])
+
+        floors = self._floors if self._floors is not None else self._overall.iloc[:0]
+        floors = floors.nsmallest(self.sample_size, _PRIORITY)
+
+        # Fill the remaining slots from the overall reservoir in priority order
+        rest = self._overall[~self._overall.index.isin(floors.index)]
+        rest = rest.nsmallest(self.sample_size - len(floors), _PRIORITY)
+        sample = pd.concat([floors, rest]).sort_values(_PRIORITY, kind='stable')
+
+        sampled = sample[_STRATUM].value_counts()
+        report = pd.DataFrame({'population': self.population})
+        report['sampled'] = sampled.reindex(report.index).fillna(0).astype('int64')
+        report['weight'] = report['population'] / report['sampled'].where(report['sampled'] > 0)
+        report = report.sort_values('population', ascending=False)
+
+        sample['sample_weight'] = sample[_STRATUM].map(report['weight']).to_numpy()
+        sample = sample.drop(columns=[_PRIORITY, _STRATUM])
+
+        return sample, report
+
+
+def stratified_sample(chunks, sample_size=None, min_per_stratum=None, random_state=42):
+    """
+    Draw a reproducible stratified reservoir sample from an iterable of chunks
+    """
+    reservoir = StratifiedReservoir(sample_size, min_per_stratum, random_state)
+    for chunk in chunks:
+        reservoir.update(chunk)
+    return reservoir.result()
+
+
+def sample_frame(df, sample_size=None, chunk_size=None, random_state=42):
+    """
+    Stratified sample of an in-memory frame, fed to the reservoir in chunks;
+    sample rows keep their df labels.
+
+    The dashboard needs the whole upload parsed anyway, so it samples the
+    cached frame rather than streaming the file a second time.
+    """
+    chunk_size = chunk_size or SAMPLING_CONFIG["chunk_size"]
+    chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+    return stratified_sample(chunks, sample_size, random_state=random_state)
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+from config import PLATFORMS
+
+SEARCH_FIELDS = ['username', 'location', 'interest']
+NGRAM = 3
+# Code points per padded batch of values while building an index
+BUILD_BATCH_POINTS = 1 << 20
+
+
+def default_search_columns(df):
+    """
+    Text columns covered by the data-table search
+    """
+    columns = ['email'] + [f"{field}_{suffix}" for field in SEARCH_FIELDS for suffix in PLATFORMS.values()]
+    return [col for col in columns if col in df.columns]
+
+
+def _code_points(texts):
+    """
+    Code points of texts as a (texts, max length) array padded with 0
+    """
+    chars = np.asarray(texts, dtype=str)
+    return chars.view(np.uint32).reshape(len(chars), chars.dtype.itemsize // 4)
+
+
+def _trigram_codes(points, alphabet):
+    """
+    Trigram codes per text from code points over a sorted alphabet (which
+    includes the 0 padding); returns (codes, valid) of shape
+    (texts, max length - 2), where valid marks trigrams fully inside a text
+    """
+    dense = np.searchsorted(alphabet, points).astype(np.uint64)
+    size = np.uint64(len(alphabet))
+    codes = (dense[:, :-2] * size + dense[:, 1:-1]) * size + dense[:, 2:]
+    return codes, points[:, 2:] != 0
+
+
+def _length_batches(lengths, max_points=None):
+    """
+    Yield ids of texts in batches of similar length whose padded
+    (texts, max length) block holds at most max_points code points; a text
+    longer than that gets a batch of its own
+    """
+    max_points = max_points or BUILD_BATCH_POINTS
+    order = np.argsort(lengths, kind='stable')
+    sorted_lengths = lengths[order]
+
+    start = 0
+    while start < len(order):
+        end = min(len(order), start + max(1, max_points // max(int(sorted_lengths[start]), 1)))
+        # Lengths grow within the batch, so shrink it to fit its longest text
+        end = start + max(1, min(end - start, max_points // max(int(sorted_lengths[end - 1]), 1)))
+        yield order[start:end]
+        start = end
+
+
+class ColumnIndex:
+    """
+    Trigram index over the distinct values of one column.
+
+    Postings point at distinct values rather than rows; a CSR layout maps
+    each distinct value to the rows holding it, and another maps each
+    trigram to the sorted ids of the values containing it.
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values)
+        self.values = pd.Series(uniques, dtype=object).astype(str).str.lower().to_numpy()
+
+        # Rows grouped by value id: rows of value i are row_ids[offsets[i]:offsets[i + 1]]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.row_ids = np.argsort(codes, kind='stable')[int((codes < 0).sum()):]
+        self.sorted_ids = np.argsort(self.values, kind='stable')
+
+        # Postings of trigram grams[i] are posting_ids[gram_offsets[i]:gram_offsets[i + 1]]
+        text_points = np.frombuffer(''.join(self.values).encode('utf-32-le'), dtype=np.uint32)
+        self.alphabet = np.flatnonzero(np.bincount(text_points, minlength=1)).astype(np.uint32)
+        self.alphabet = np.union1d(self.alphabet, np.zeros(1, dtype=np.uint32))
+
+        # Values are padded to a common length per batch, not across the
+        # column, so one long value cannot inflate the whole build
+        lengths = np.fromiter((len(value) for value in self.values), dtype=np.int64, count=len(self.values))
+        batch_grams, batch_ids = [], []
+        for batch in _length_batches(lengths):
+            points = _code_points(self.values[batch])
+            if points.shape[1] < NGRAM:
+                continue
+            grams, valid = _trigram_codes(points, self.alphabet)
+            ids = np.broadcast_to(batch.astype(np.uint64)[:, None], grams.shape)
+            batch_grams.append(grams[valid])
+            batch_ids.append(ids[valid])
+        if not batch_grams:
+            self.grams = np.empty(0, dtype=np.uint64)
+            self.gram_offsets = np.zeros(1, dtype=np.int64)
+            self.posting_ids = np.empty(0, dtype=np.uint32)
+            return
+        grams, ids = np.concatenate(batch_grams), np.concatenate(batch_ids)
+        del batch_grams, batch_ids
+
+        if len(self.alphabet) ** 3 < 1 << 32:
+            # One sort over (trigram, value id) pairs packed into a uint64 key
+            keys = np.sort((grams << np.uint64(32)) | ids)
+            grams, ids = keys >> np.uint64(32), keys & np.uint64(0xFFFFFFFF)
+        else:
+            order = np.lexsort((ids, grams))
+            grams, ids = grams[order], ids[order]
+        # A trigram repeated within one value appears as adjacent duplicates
+        first = np.concatenate([[True], (grams[1:] != grams[:-1]) | (ids[1:] != ids[:-1])])
+        grams, self.posting_ids = grams[first], ids[first].astype(np.uint32)
+
+        starts = np.flatnonzero(np.concatenate([[True], grams[1:] != grams[:-1]])) if len(grams) else np.empty(0, dtype=np.int64)
+        self.grams = grams[starts]
+        self.gram_offsets = np.append(starts, len(grams))
+
+    @property
+    def nbytes(self):
+        arrays = [self.offsets, self.row_ids, self.sorted_ids, self.alphabet, self.grams, self.gram_offsets, self.posting_ids]
+        # Lowercased values are Python strings in an object array: a 49-byte
+        # str header plus an 8-byte pointer each, on top of the characters
+        text = sum(len(value) for value in self.values) + 57 * len(self.values)
+        return sum(array.nbytes for array in arrays) + text
+
+    def _query_grams(self, query):
+        points = _code_points([query])
+        if not np.isin(points, self.alphabet).all():
+            return None
+        codes, _ = _trigram_codes(points, self.alphabet)
+        return set(codes.ravel().tolist())
+
+    def _postings(self, gram):
+        i = np.searchsorted(self.grams, gram)
+        if i == len(self.grams) or self.grams[i] != gram:
+            return None
+        return self.posting_ids[self.gram_offsets[i]:self.gram_offsets[i + 1]]
+
+    def match_values(self, query, mode='contains'):
+        """
+        Ids of distinct values matching a lowercase query
+        """
+        if mode == 'prefix':
+            lo = np.searchsorted(self.values, query, side='left', sorter=self.sorted_ids)
+            hi = np.searchsorted(self.values, query + '\uffff', side='left', sorter=self.sorted_ids)
+            return self.sorted_ids[lo:hi]
+
+        if len(query) < NGRAM:
+            return np.flatnonzero(pd.Series(self.values).str.contains(query, regex=False).to_numpy())
+
+        grams = self._query_grams(query)
+        if grams is None:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = None
+        for gram in grams:
+            ids = self._postings(gram)
+            if ids is None:
+                return np.empty(0, dtype=np.int64)
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+
+        if len(query) == NGRAM:
+            return candidates
+
+        # Trigrams can all occur without being contiguous, so confirm on the survivors
+        confirmed = pd.Series(self.values[candidates]).str.contains(query, regex=False).to_numpy()
+        return candidates[confirmed]
+
+    def rows_for(self, value_ids):
+        value_ids = np.asarray(value_ids, dtype=np.int64)
+        starts = self.offsets[value_ids]
+        lengths = self.offsets[value_ids + 1] - starts
+
+        # Gather every [start, start + length) slice of row_ids in one indexing op
+        positions = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.row_ids[positions]
+
+
+class SearchIndex:
+    """
+    Per-column inverted indexes answering substring and prefix queries
+    with positional row ids.
+
+    The index is built once over a whole dataset; filtered views pass their
+    positions in it as view_rows to get matches relative to the view.
+    """
+
+    def __init__(self, df, columns=None):
+        self.columns = columns or default_search_columns(df)
+        self.n_rows = len(df)
+        self.indexes = {col: ColumnIndex(df[col]) for col in self.columns}
+
+    @property
+    def nbytes(self):
+        return sum(index.nbytes for index in self.indexes.values())
+
+    def search(self, query, columns=None, mode='contains', view_rows=None):
+        """
+        Sorted positional row ids where any of the columns matches query,
+        positions in view_rows (sorted positions of a view) when given
+        """
+        if view_rows is not None:
+            view_rows = np.asarray(view_rows)
+            return np.flatnonzero(np.isin(view_rows, self.search(query, columns, mode), assume_unique=True))
+
+        query = query.strip().lower()
+        if not query:
+            return np.arange(self.n_rows)
+
+        matches = [
+            self.indexes[col].rows_for(self.indexes[col].match_values(query, mode))
+            for col in (columns or self.columns) if col in self.indexes
+        ]
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+
+        return np.unique(np.concatenate(matches))
@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+
+from config import PLATFORMS, SKETCH_CONFIG
+
+OTHER = 'Other'
+DISTINCT_FIELDS = ['username']
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary keeping at most capacity counters.
+
+    Counts are upper bounds: each tracked value carries the error it may
+    have inherited, and floor bounds the count of any value that is not
+    tracked. Summaries merge by adding counters, so chunks and files can
+    be sketched separately and combined.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or SKETCH_CONFIG["top_k_capacity"]
+        self.counts = pd.Series(dtype='int64')
+        self.errors = pd.Series(dtype='int64')
+        self.floor = 0
+        self.total = 0
+
+    def update(self, values):
+        """
+        Add a chunk of values, ignoring missing ones
+        """
+        counts = pd.Series(values).value_counts(sort=False)
+        counts = counts[counts > 0]
+
+        chunk = SpaceSaving(self.capacity)
+        chunk.counts = pd.Series(counts.to_numpy(dtype='int64'), index=counts.index.astype(object))
+        chunk.errors = pd.Series(0, index=chunk.counts.index, dtype='int64')
+        chunk.total = int(counts.sum())
+        chunk._truncate()
+
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Fold another summary into this one
+        """
+        keys = self.counts.index.union(other.counts.index)
+        # A value missing from one side may still have up to that side's floor
+        self.counts = self.counts.reindex(keys, fill_value=self.floor) + other.counts.reindex(keys, fill_value=other.floor)
+        self.errors = self.errors.reindex(keys, fill_value=self.floor) + other.errors.reindex(keys, fill_value=other.floor)
+        self.floor += other.floor
+        self.total += other.total
+        self._truncate()
+        return self
+
+    def _truncate(self):
+        if len(self.counts) <= self.capacity:
+            return
+        order = self.counts.sort_values(ascending=False, kind='stable')
+        self.floor = max(self.floor, int(order.iloc[self.capacity]))
+        keep = order.index[:self.capacity]
+        self.counts = self.counts[keep]
+        self.errors = self.errors[keep]
+
+    def top(self, n=10):
+        """
+        The n heaviest values with their estimated count, guaranteed lower
+        bound, and whether they are certainly among the true top n
+        """
+        order = self.counts.sort_values(ascending=False, kind='stable')
+        top = pd.DataFrame({'count': order.iloc[:n]})
+        top['lower'] = top['count'] - self.errors[top.index]
+
+        # Nothing outside the list can beat a value whose lower bound clears the next estimate
+        runner_up = max(int(order.iloc[n]) if len(order) > n else 0, self.floor)
+        top['guaranteed'] = top['lower'] >= runner_up
+
+        return top
+
+    def top_with_other(self, n=10):
+        """
+        Counts of the n heaviest values plus an 'Other' bucket for the rest
+        """
+        counts = self.top(n)['count']
+        other = max(self.total - int(counts.sum()), 0)
+        if other:
+            counts = pd.concat([counts, pd.Series({OTHER: other})])
+        return counts
+
+    def max_error(self):
+        """
+        Largest possible overcount of any reported value
+        """
+        return int(max(self.errors.max() if len(self.errors) else 0, self.floor))
+
+
+def build_top_k_sketches(chunks, fields=('location', 'interest'), capacity=None):
+    """
+    One Space-Saving summary per (field, platform), updated chunk by chunk
+
+    Returns {field: {platform: SpaceSaving}}.
+    """
+    sketches = {field: {platform: SpaceSaving(capacity) for platform in PLATFORMS} for field in fields}
+
+    for chunk in chunks:
+        for field in fields:
+            for platform, suffix in PLATFORMS.items():
+                col = f"{field}_{suffix}"
+                if col in chunk.columns:
+                    sketches[field][platform].update(chunk[col])
+
+    return sketches
+
+
+def merge_sketches(sketches):
+    """
+    Combine per-platform summaries into one across all platforms
+    """
+    merged = None
+    for sketch in sketches:
+        if merged is None:
+            merged = SpaceSaving(sketch.capacity)
+        merged.merge(sketch)
+    return merged
+
+
+def hash_values(values):
+    """
+    64-bit hashes of the non-missing values, stable across processes and
+    dtypes so sketches of different files can be merged
+    """
+    values = pd.Series(values).dropna()
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def _bit_length(values):
+    # Exact for uint64: each 32-bit half converts to float64 without rounding
+    high = (values >> np.uint64(32)).astype('float64')
+    low = (values & np.uint64(0xFFFFFFFF)).astype('float64')
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over 64-bit value hashes.
+
+    Registers merge with an element-wise max, so chunks, platforms and
+    files can be counted separately. While the number of distinct hashes
+    stays under exact_limit the hashes themselves are kept too, as a uint64
+    array, and count() is exact.
+    """
+
+    def __init__(self, precision=None, exact_limit=None):
+        self.precision = precision or SKETCH_CONFIG["hll_precision"]
+        self.exact_limit = SKETCH_CONFIG["hll_exact_limit"] if exact_limit is None else exact_limit
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, values):
+        """
+        Add a chunk of values, ignoring missing ones
+        """
+        return self.update_hashes(hash_values(values))
+
+    def update_hashes(self, hashes):
+        p = np.uint64(self.precision)
+        buckets = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # Position of the first set bit in the remaining 64 - p bits
+        ranks = (64 - self.precision + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+        if self.hashes is not None:
+            self._keep_hashes(hashes)
+
+        return self
+
+    def _keep_hashes(self, hashes):
+        self.hashes = pd.unique(np.concatenate([self.hashes, hashes]))
+        if len(self.hashes) > self.exact_limit:
+            self.hashes = None
+
+    def merge(self, other):
+        """
+        Fold another counter of the same precision into this one
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog counters of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+        if self.hashes is not None and other.hashes is not None:
+            self._keep_hashes(other.hashes)
+        else:
+            self.hashes = None
+
+        return self
+
+    @property
+    def is_exact(self):
+        return self.hashes is not None
+
+    def estimate(self):
+        """
+        HyperLogLog estimate from the registers alone
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return m * np.log(m / zeros)
+        return raw
+
+    def count(self, approximate=False):
+        """
+        Distinct values seen: exact while the hashes are kept, unless
+        approximate asks for the register estimate
+        """
+        if self.is_exact and not approximate:
+            return len(self.hashes)
+        return int(round(self.estimate()))
+
+    def relative_error(self):
+        """
+        Standard error of the register estimate
+        """
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+def build_distinct_sketches(chunks, fields=None, precision=None, exact_limit=None):
+    """
+    One HyperLogLog per email column and per (field, platform) column,
+    updated chunk by chunk
+
+    Returns {column: HyperLogLog}, e.g. 'email' and 'username_x'.
+    """
+    fields = fields or DISTINCT_FIELDS
+    sketches = {}
+
+    for chunk in chunks:
+        columns = ['email'] + [f"{field}_{suffix}" for field in fields for suffix in PLATFORMS.values()]
+        for col in columns:
+            if col in chunk.columns:
+                sketches.setdefault(col, HyperLogLog(precision, exact_limit)).update(chunk[col])
+
+    return sketches
@@ -4,7 +4,9 @@ from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 import streamlit as st
-from utils.data_processing import get_user_data_by_type, get_location_distribution, get_interest_distribution, calculate_session_duration
+from config import CHART_CONFIG
+from utils.data_processing import get_numeric_by_type, get_top_distribution, summarize_session_durations, get_platform_summary, get_long_table
+from utils.aggregates import histogram, histogram_edges
 
 def create_user_comparison_chart(df, chart_type, users_to_analyze):
     """
@@ -19,6 +21,8 @@ def create_user_comparison_chart(df, chart_type, users_to_analyze):
             return create_interest_comparison(df, users_to_analyze)
         elif chart_type == 'engagement':
             return create_engagement_comparison(df, users_to_analyze)
+        elif chart_type in ('followers', 'following'):
+            return create_histogram_comparison(df, chart_type, users_to_analyze)
         else:
             return create_default_chart()
     except Exception as e:
@@ -29,27 +33,52 @@ def create_age_comparison(df, users_to_analyze):
     """
     Create age distribution comparison chart
     """
-    age_data = get_user_data_by_type(df, 'age', users_to_analyze)
+    return create_histogram_comparison(df, 'age', users_to_analyze)
+
+def create_histogram_comparison(df, data_type, users_to_analyze, strategy=None):
+    """
+    Overlaid histograms of a numeric field, binned server-side
+
+    Users share one set of edges so their bars line up, and the figure
+    carries one bar per bin regardless of how many rows were counted.
+    """
+    strategy = strategy or CHART_CONFIG["histogram_strategies"].get(data_type, 'fixed')
+    values = get_numeric_by_type(df, data_type, users_to_analyze)
+    label = data_type.replace('_', ' ').title()
+
+    if not any(len(user_values) for user_values in values.values()):
+        return create_default_chart(f"No {data_type} data available")
+
+    edges = histogram_edges(np.concatenate(list(values.values())), strategy)
+    if strategy == 'log':
+        # Bars on a log axis cannot take data-unit widths, so bins are categories
+        x = [f"{low:,.0f}-{high:,.0f}" for low, high in zip(edges[:-1], edges[1:])]
+        width = None
+    else:
+        x = (edges[:-1] + edges[1:]) / 2
+        width = np.diff(edges)
 
     fig = go.Figure()
 
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
 
-    for i, (user, ages) in enumerate(age_data.items()):
-        if ages:
-            fig.add_trace(go.Histogram(
-                x=ages,
+    for i, (user, user_values) in enumerate(values.items()):
+        if len(user_values):
+            fig.add_trace(go.Bar(
+                x=x,
+                y=histogram(user_values, edges),
+                width=width,
                 name=user,
                 opacity=0.7,
-                marker_color=colors[i % len(colors)],
-                nbinsx=15
+                marker_color=colors[i % len(colors)]
             ))
 
     fig.update_layout(
-        title="Age Distribution Comparison",
-        xaxis_title="Age",
+        title=f"{label} Distribution Comparison",
+        xaxis_title=label,
         yaxis_title="Count",
         barmode='overlay',
+        bargap=0,
         height=400
     )
 
@@ -59,7 +88,8 @@ def create_location_comparison(df, users_to_analyze):
     """
     Create location distribution comparison chart
     """
-    location_data = get_location_distribution(df, users_to_analyze)
+    # Top values per user from the heavy-hitter sketch; the long tail is 'Other'
+    location_data = get_top_distribution(df, 'location', users_to_analyze)
 
     # Prepare data for plotting
     plot_data = []
@@ -94,7 +124,8 @@ def create_interest_comparison(df, users_to_analyze):
     """
     Create interest distribution comparison chart
     """
-    interest_data = get_interest_distribution(df, users_to_analyze)
+    # Top values per user from the heavy-hitter sketch; the long tail is 'Other'
+    interest_data = get_top_distribution(df, 'interest', users_to_analyze)
 
     # Prepare data for plotting
     plot_data = []
@@ -129,27 +160,17 @@ def create_engagement_comparison(df, users_to_analyze):
     """
     Create followers vs following comparison chart
     """
-    engagement_data = []
+    summary = get_platform_summary(df, users_to_analyze)
+    summary = summary[summary['rows'] > 0]
 
-    for user in users_to_analyze:
-        suffix = user.split()[-1].lower()
-        followers_col = f"followers_{suffix}"
-        following_col = f"following_{suffix}"
-
-        if followers_col in df.columns and following_col in df.columns:
-            followers = df[followers_col].fillna(0).sum()
-            following = df[following_col].fillna(0).sum()
-
-            engagement_data.append({
-                'User': user,
-                'Followers': followers,
-                'Following': following
-            })
-
-    if not engagement_data:
+    if summary.empty:
         return create_default_chart("No engagement data available")
 
-    engagement_df = pd.DataFrame(engagement_data)
+    engagement_df = pd.DataFrame({
+        'User': summary.index.astype(str),
+        'Followers': summary['followers'].fillna(0).to_numpy(),
+        'Following': summary['following'].fillna(0).to_numpy()
+    })
 
     fig = go.Figure()
 
@@ -177,46 +198,89 @@ def create_engagement_comparison(df, users_to_analyze):
 
     return fig
 
-def create_activity_timeline(df, users_to_analyze):
+def get_activity_sessions(df, users_to_analyze):
     """
-    Create user activity timeline
+    Login/logout pairs for the selected users with durations in hours.
+
+    Sessions whose logout precedes the login are dropped.
     """
-    try:
-        timeline_data = []
+    long_df = get_long_table(df)
+    sessions = long_df.loc[long_df['platform'].isin(users_to_analyze), ['platform', 'login', 'logout']].dropna()
+    sessions = sessions[sessions['logout'] >= sessions['login']]
+
+    return pd.DataFrame({
+        'User': sessions['platform'].astype(str).to_numpy(),
+        'Login': sessions['login'].to_numpy(),
+        'Logout': sessions['logout'].to_numpy(),
+        'Duration': (sessions['logout'] - sessions['login']).dt.total_seconds().to_numpy() / 3600
+    })
+
+def bucket_concurrent_sessions(sessions, n_buckets=None):
+    """
+    Count sessions active in each time bucket, per user, with a sweep over
+    bucket indices instead of one bar per session
+    """
+    n_buckets = n_buckets or CHART_CONFIG["timeline_buckets"]
 
-        for user in users_to_analyze:
-            suffix = user.split()[-1].lower()
-            login_col = f"date_of_login_{suffix}"
-            logout_col = f"date_of_logout_{suffix}"
+    login = sessions['Login'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    logout = sessions['Logout'].to_numpy(dtype='datetime64[ns]').astype('int64')
+    edges = np.linspace(login.min(), max(logout.max(), login.min() + 1), n_buckets + 1)
 
-            if login_col in df.columns and logout_col in df.columns:
-                user_df = df[[login_col, logout_col]].dropna()
+    start = np.clip(np.searchsorted(edges, login, side='right') - 1, 0, n_buckets - 1)
+    end = np.clip(np.searchsorted(edges, logout, side='right') - 1, 0, n_buckets - 1)
 
-                for _, row in user_df.iterrows():
-                    timeline_data.append({
-                        'User': user,
-                        'Login': row[login_col],
-                        'Logout': row[logout_col],
-                        'Duration': (row[logout_col] - row[login_col]).total_seconds() / 3600
-                    })
+    users, user_codes = np.unique(sessions['User'].to_numpy(), return_inverse=True)
+    width = n_buckets + 1
+    # +1 where a session starts, -1 after the bucket it ends in
+    starts = np.bincount(user_codes * width + start, minlength=len(users) * width)
+    ends = np.bincount(user_codes * width + end + 1, minlength=len(users) * width)
+    active = np.cumsum((starts - ends).reshape(len(users), width), axis=1)[:, :n_buckets]
 
-        if not timeline_data:
-            return create_default_chart("No activity timeline data available")
+    bucket_starts = pd.to_datetime(edges[:-1].astype('int64'))
+    return pd.DataFrame({
+        'User': np.repeat(users, n_buckets),
+        'Time': np.tile(bucket_starts, len(users)),
+        'Active Sessions': active.ravel()
+    })
 
-        timeline_df = pd.DataFrame(timeline_data)
+def create_activity_timeline(df, users_to_analyze):
+    """
+    Create user activity timeline
 
-        fig = px.timeline(
-            timeline_df,
-            x_start='Login',
-            x_end='Logout',
-            y='User',
+    Small selections get one bar per session; above
+    CHART_CONFIG["timeline_max_sessions"] sessions the chart shows
+    concurrent-session counts per time bucket instead.
+    """
+    try:
+        timeline_df = get_activity_sessions(df, users_to_analyze)
+
+        if timeline_df.empty:
+            return create_default_chart("No activity timeline data available")
+
+        if len(timeline_df) <= CHART_CONFIG["timeline_max_sessions"]:
+            fig = px.timeline(
+                timeline_df,
+                x_start='Login',
+                x_end='Logout',
+                y='User',
+                color='User',
+                hover_data=['Duration'],
+                title="User Activity Timeline",
+                height=400
+            )
+            fig.update_layout(xaxis_title="Time", yaxis_title="Users")
+            return fig
+
+        bucketed = bucket_concurrent_sessions(timeline_df)
+        fig = px.line(
+            bucketed,
+            x='Time',
+            y='Active Sessions',
             color='User',
-            title="User Activity Timeline",
+            title=f"User Activity Timeline ({len(timeline_df):,} sessions)",
             height=400
         )
-
-        fig.update_layout(xaxis_title="Time", yaxis_title="Users")
-
+        fig.update_layout(xaxis_title="Time", yaxis_title="Concurrent sessions")
         return fig
 
     except Exception as e:
@@ -228,49 +292,15 @@ def create_engagement_heatmap(df, users_to_analyze):
     """
     try:
         # Create engagement metrics matrix
-        metrics = []
-        user_names = []
-
-        for user in users_to_analyze:
-            suffix = user.split()[-1].lower()
-
-            # Get user metrics
-            age_col = f"age_{suffix}"
-            followers_col = f"followers_{suffix}"
-            following_col = f"following_{suffix}"
-
-            user_metrics = []
-            user_names.append(user)
-
-            # Age (normalized)
-            if age_col in df.columns:
-                avg_age = df[age_col].mean()
-                user_metrics.append(avg_age if not pd.isna(avg_age) else 0)
-            else:
-                user_metrics.append(0)
-
-            # Followers (normalized)
-            if followers_col in df.columns:
-                total_followers = df[followers_col].sum()
-                user_metrics.append(total_followers / 1000 if total_followers > 0 else 0)  # Scale down
-            else:
-                user_metrics.append(0)
-
-            # Following (normalized)
-            if following_col in df.columns:
-                total_following = df[following_col].sum()
-                user_metrics.append(total_following / 1000 if total_following > 0 else 0)  # Scale down
-            else:
-                user_metrics.append(0)
-
-            # Engagement ratio
-            if len(user_metrics) >= 2 and user_metrics[2] > 0:
-                engagement_ratio = user_metrics[1] / user_metrics[2]
-                user_metrics.append(engagement_ratio)
-            else:
-                user_metrics.append(0)
-
-            metrics.append(user_metrics)
+        summary = get_platform_summary(df, users_to_analyze)
+        user_names = list(summary.index.astype(str))
+
+        avg_age = summary['avg_age'].fillna(0)
+        followers_k = summary['followers'].fillna(0).clip(lower=0) / 1000  # Scale down
+        following_k = summary['following'].fillna(0).clip(lower=0) / 1000  # Scale down
+        engagement_ratio = (followers_k / following_k.where(following_k > 0)).fillna(0)
+
+        metrics = pd.concat([avg_age, followers_k, following_k, engagement_ratio], axis=1).to_numpy().tolist()
 
         if not metrics:
             return create_default_chart("No data for heatmap")
@@ -296,19 +326,43 @@ def create_engagement_heatmap(df, users_to_analyze):
 def create_session_duration_chart(df, users_to_analyze):
     """
     Create session duration analysis chart
+
+    Boxes are drawn from quartiles and whiskers computed server-side, with
+    a capped sample of outliers, instead of shipping every duration.
     """
-    session_data = calculate_session_duration(df, users_to_analyze)
+    session_stats = summarize_session_durations(df, users_to_analyze)
 
     fig = go.Figure()
 
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
 
-    for i, (user, durations) in enumerate(session_data.items()):
-        if durations:
-            fig.add_trace(go.Box(
-                y=durations,
-                name=user,
-                marker_color=colors[i % len(colors)]
+    for i, user in enumerate(users_to_analyze):
+        stats = session_stats.get(user)
+        if stats is None:
+            continue
+        color = colors[i % len(colors)]
+
+        fig.add_trace(go.Box(
+            x=[user],
+            q1=[stats['q1']],
+            median=[stats['median']],
+            q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']],
+            upperfence=[stats['upperfence']],
+            name=user,
+            legendgroup=user,
+            marker_color=color
+        ))
+
+        if len(stats['outliers']):
+            fig.add_trace(go.Scatter(
+                x=[user] * len(stats['outliers']),
+                y=stats['outliers'],
+                mode='markers',
+                name=f"{user} outliers",
+                legendgroup=user,
+                showlegend=False,
+                marker=dict(color=color, size=4, opacity=0.6)
             ))
 
     fig.update_layout(